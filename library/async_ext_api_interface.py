@@ -0,0 +1,162 @@
+"""
+Filename: async_ext_api_interface.py
+Description: asyncio version of the OpenLibrary client, built on aiohttp.
+Requires aiohttp, which is only needed for this module.
+"""
+
+import asyncio
+import time
+
+import aiohttp
+
+from library import metrics
+from library.ext_api_interface import Books_API
+
+class AsyncBooks_API(Books_API):
+    """Awaitable counterpart of Books_API.
+
+    Shares the configuration, cache, circuit breaker, retry policy, rate limiter
+    and response parsing of Books_API, but sends requests through an aiohttp
+    session so the event loop is never blocked on the network.
+    """
+
+    def __init__(self, api_url=None, session=None, **kwargs):
+        """Constructor for the AsyncBooks_API class.
+
+        :param api_url: optional search endpoint overriding API_URL
+        :param session: optional aiohttp.ClientSession, one is created on first use
+        :param kwargs: the cache, breaker, retry, hedge_after and priority
+            options of Books_API
+        """
+        super(AsyncBooks_API, self).__init__(api_url, **kwargs)
+        self._session = session
+        self._owns_session = session is None
+
+    async def close(self):
+        """Closes the HTTP session if it was created by this object."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def make_request(self, url):
+        """Makes a HTTP request to the given URL, see Books_API.make_request.
+
+        :param url: the url used for the HTTP request
+        :returns: the JSON body of the request, None if non 200 status code or ConnectionError
+        """
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+        if not self.breaker.allow_request():
+            metrics.registry.increment('books_api.short_circuited')
+            return self._stale(url)
+        try:
+            for retry in range(self.retry.max_retries + 1):
+                if retry:
+                    metrics.registry.increment('books_api.retries')
+                    await asyncio.sleep(self.retry.delay(retry - 1))
+                json_data, transient = await self._fetch(url)
+                if not transient:
+                    break
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # cancelled, e.g. by wait_for or a client disconnect
+            self.breaker.release_trial()
+            raise
+        if transient:
+            self.breaker.record_failure()
+            return self._stale(url)
+        self.breaker.record_success()
+        if json_data is not None and self.cache is not None:
+            self.cache.put(url, json_data)
+        return json_data
+
+    async def _fetch(self, url):
+        """Performs one attempt, hedged with a second request if configured."""
+        if self.hedge_after is None:
+            return await self._attempt(url)
+        pending = {asyncio.ensure_future(self._attempt(url))}
+        done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+        if not done:
+            metrics.registry.increment('books_api.hedged')
+            pending.add(asyncio.ensure_future(self._attempt(url)))
+        result = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if not result[1]:
+                        return result
+            return result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _attempt(self, url):
+        """Sends a single HTTP request with connect and read timeouts."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(self.priority)
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        timeout = aiohttp.ClientTimeout(sock_connect=self.CONNECT_TIMEOUT,
+            sock_read=self.READ_TIMEOUT)
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            async with self._session.get(url, timeout=timeout) as response:
+                status = str(response.status)
+                if response.status != 200:
+                    return None, response.status in self.TRANSIENT_STATUS_CODES
+                return await response.json(content_type=None), False
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            return None, True
+        except aiohttp.ClientError:
+            return None, True
+        finally:
+            if metrics.registry.enabled:
+                self._record_request(url, status, time.perf_counter() - start)
+
+    async def is_book_available(self, book):
+        """Determines if a given book is available to borrow.
+
+        :param book: the title of the book
+        :returns: True if available, False if not
+        """
+        request_url = self.search_url('q', book)
+        json_data = await self.make_request(request_url)
+        return self._parse_book_available(json_data)
+
+    async def books_by_author(self, author):
+        """Gets all the books written by a given author.
+
+        :param author: the name of the author
+        :returns: the titles of all the books in a list form
+        """
+        request_url = self.search_url('author', author)
+        json_data = await self.make_request(request_url)
+        return self._parse_books_by_author(json_data)
+
+    async def get_book_info(self, book):
+        """Gets the information for a given book.
+
+        :param book: the title of the book
+        :returns: a list of dictionaries with book data
+        """
+        request_url = self.search_url('q', book)
+        json_data = await self.make_request(request_url)
+        return self._parse_book_info(json_data)
+
+    async def get_ebooks(self, book):
+        """Gets the ebooks for a given book.
+
+        :param book: the title of the book
+        :returns: data about the ebooks
+        """
+        request_url = self.search_url('q', book)
+        json_data = await self.make_request(request_url)
+        return self._parse_ebooks(json_data)
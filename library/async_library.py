@@ -0,0 +1,135 @@
+"""
+Filename: async_library.py
+Description: asyncio facade over the Library class.
+Requires aiohttp, see async_ext_api_interface.py.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from library import metrics, tracing
+from library.async_ext_api_interface import AsyncBooks_API
+from library.library import (Library, _collect_languages, _count_ebooks, _has_ebook,
+    _has_title)
+
+class AsyncLibrary:
+    """Awaitable versions of the public Library methods.
+
+    API methods go through AsyncBooks_API. DB methods run the matching Library
+    method on a dedicated single-thread executor. TinyDB is not thread-safe, so
+    every database call, read or write, is serialized on that one thread and
+    the event loop never waits on disk.
+    """
+
+    def __init__(self, library=None, api=None, executor=None):
+        """Constructor for the AsyncLibrary class.
+
+        :param library: optional Library used for the DB methods
+        :param api: optional AsyncBooks_API used for the API methods
+        :param executor: optional executor for DB calls, it must run one call at
+            a time; a single-thread executor is created by default
+        """
+        self.library = library or Library()
+        self.api = api or AsyncBooks_API()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1,
+            thread_name_prefix='library-db')
+
+    async def close(self):
+        """Closes the HTTP session and waits for pending DB calls to finish."""
+        await self.api.close()
+        if self._owns_executor:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _run_db(self, method, *args):
+        """Runs a Library DB method on the DB executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args))
+
+    ############################################################################
+    ################################ API METHODS ###############################
+    ############################################################################
+
+    @metrics.instrument('async_library.is_ebook')
+    @tracing.traced('async_library.is_ebook')
+    async def is_ebook(self, book):
+        """Checks if the book is an e-book.
+
+        :param book: the title of the book
+        :returns: True if yes, False if not
+        """
+        return _has_ebook(await self.api.get_ebooks(book), book)
+
+    @metrics.instrument('async_library.get_ebooks_count')
+    @tracing.traced('async_library.get_ebooks_count')
+    async def get_ebooks_count(self, book):
+        """Gets the number of ebooks for a given book.
+
+        :param book: the title of the book
+        :returns: the number of ebooks
+        """
+        return _count_ebooks(await self.api.get_ebooks(book))
+
+    @metrics.instrument('async_library.is_book_by_author')
+    @tracing.traced('async_library.is_book_by_author')
+    async def is_book_by_author(self, author, book):
+        """Determines if the book was written by a given author.
+
+        :param author: the name of the author
+        :param book: the name of the book
+        :returns: True if the book was written by the author, False if not
+        """
+        return _has_title(await self.api.books_by_author(author), book)
+
+    @metrics.instrument('async_library.get_languages_for_book')
+    @tracing.traced('async_library.get_languages_for_book')
+    async def get_languages_for_book(self, book):
+        """Get the available languages for a given book.
+
+        :param book: the title of the book
+        :returns: the set of languages the book is available in
+        """
+        return _collect_languages(await self.api.get_book_info(book))
+
+    ############################################################################
+    ################################# DB METHODS ###############################
+    ############################################################################
+
+    async def register_patron(self, fname, lname, age, memberID):
+        """Registers a Patron with the library, see Library.register_patron."""
+        return await self._run_db(self.library.register_patron, fname, lname, age, memberID)
+
+    async def is_patron_registered(self, patron):
+        """Determines if the Patron is registered, see Library.is_patron_registered."""
+        return await self._run_db(self.library.is_patron_registered, patron)
+
+    async def borrow_book(self, book, patron):
+        """Borrows a book for a Patron, see Library.borrow_book."""
+        return await self._run_db(self.library.borrow_book, book, patron)
+
+    async def return_borrowed_book(self, book, patron):
+        """Returns a borrowed book for a Patron, see Library.return_borrowed_book."""
+        return await self._run_db(self.library.return_borrowed_book, book, patron)
+
+    async def is_book_borrowed(self, book, patron):
+        """Determines if the Patron has borrowed a book, see Library.is_book_borrowed.
+
+        Only looks at the Patron object, so it runs directly on the event loop.
+        """
+        return self.library.is_book_borrowed(book, patron)
+
+    async def complete_title(self, prefix, limit=10):
+        """Autocompletes a borrowed title, see Library.complete_title."""
+        return await self._run_db(self.library.complete_title, prefix, limit)
+
+    async def match_title(self, text, limit=10):
+        """Finds borrowed titles tolerating typos, see Library.match_title."""
+        return await self._run_db(self.library.match_title, text, limit)
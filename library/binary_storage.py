@@ -0,0 +1,352 @@
+"""
+Filename: binary_storage.py
+Description: compact binary TinyDB storage for the patron table, with
+converters to and from the JSON db.json format
+"""
+
+import argparse
+import gc
+import json
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain, compress, islice, repeat
+from operator import eq, itemgetter
+
+from tinydb.storages import Storage, JSONStorage, touch
+
+MAGIC = b'LPDB'
+VERSION = 2
+PATRON_FIELDS = ('fname', 'lname', 'age', 'memberID', 'borrowed_books')
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+MEMBER_ID_INT = 0
+MEMBER_ID_STR = 1
+
+# joins the string table when no string contains it, so it splits in one call
+SEPARATOR = '\x00'
+
+_PATRON_KEYS = frozenset(PATRON_FIELDS)
+
+
+class InvalidBinaryFileException(Exception):
+    """Custom Exception for a file that is not in the binary patron format."""
+    pass
+
+
+def _is_int64(value):
+    return type(value) is int and INT64_MIN <= value <= INT64_MAX
+
+
+def _is_patron_record(key, doc):
+    """Determines if a document can be stored in the packed patron layout."""
+    key = str(key)
+    if not (key.isascii() and key.isdigit()) or str(int(key)) != key or int(key) > 0xFFFFFFFF:
+        return False
+    if type(doc) is not dict or doc.keys() != _PATRON_KEYS:
+        return False
+    if type(doc['fname']) is not str or type(doc['lname']) is not str:
+        return False
+    if not _is_int64(doc['age']):
+        return False
+    if not (type(doc['memberID']) is str or _is_int64(doc['memberID'])):
+        return False
+    books = doc['borrowed_books']
+    return type(books) is list and all(type(book) is str for book in books)
+
+
+def _all_int64(values):
+    return set(map(type, values)) <= {int} and (not values
+        or (INT64_MIN <= min(values) and max(values) <= INT64_MAX))
+
+
+def _all_patron_records(keys, docs):
+    """Checks _is_patron_record for a whole table at once, column by column.
+
+    :param keys: the document IDs, as strings
+    :param docs: the documents
+    :returns: True if every document can be packed
+    """
+    if set(map(type, docs)) - {dict}:
+        return False
+    if not all(map(eq, map(dict.keys, docs), repeat(_PATRON_KEYS))):
+        return False
+    if not (all(map(str.isascii, keys)) and all(map(str.isdigit, keys))):
+        return False
+    ids = list(map(int, keys))
+    if list(map(str, ids)) != keys or (ids and max(ids) > 0xFFFFFFFF):
+        return False
+    if set(map(type, map(itemgetter('fname'), docs))) - {str}:
+        return False
+    if set(map(type, map(itemgetter('lname'), docs))) - {str}:
+        return False
+    if not _all_int64(list(map(itemgetter('age'), docs))):
+        return False
+    members = list(map(itemgetter('memberID'), docs))
+    if set(map(type, members)) - {int, str}:
+        return False
+    if not _all_int64([member for member in members if type(member) is int]):
+        return False
+    books = list(map(itemgetter('borrowed_books'), docs))
+    if set(map(type, books)) - {list}:
+        return False
+    return not set(map(type, chain.from_iterable(books))) - {str}
+
+
+def _pack_array(typecode, values):
+    data = array(typecode, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+class _Reader:
+    """Sequential reader over the encoded bytes."""
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def take(self, size):
+        if self.offset + size > len(self.data):
+            raise InvalidBinaryFileException("Unexpected end of binary patron data")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def u32(self):
+        return struct.unpack('<I', self.take(4))[0]
+
+    def array(self, typecode, count):
+        data = array(typecode)
+        data.frombytes(self.take(count * data.itemsize))
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return data
+
+
+def encode(data):
+    """Encodes TinyDB data into the binary patron format.
+
+    Documents shaped like Library_DB patron records are packed into columns
+    referencing a shared string table; any other document is kept as JSON so
+    the encoding stays lossless.
+
+    :param data: the TinyDB data, a dictionary of table name to documents
+    :returns: the encoded bytes
+    """
+    tables = []
+    sources = []
+    for name, docs in data.items():
+        keys = list(map(str, docs))
+        patrons = list(docs.values())
+        others = []
+        if not _all_patron_records(keys, patrons):
+            keys = []
+            patrons = []
+            for position, (key, doc) in enumerate(docs.items()):
+                if _is_patron_record(key, doc):
+                    keys.append(str(key))
+                    patrons.append(doc)
+                else:
+                    others.append([position, str(key), doc])
+        fnames = list(map(itemgetter('fname'), patrons))
+        lnames = list(map(itemgetter('lname'), patrons))
+        members = list(map(itemgetter('memberID'), patrons))
+        member_kinds = [MEMBER_ID_STR if type(member) is str else MEMBER_ID_INT
+            for member in members]
+        books = list(map(itemgetter('borrowed_books'), patrons))
+        titles = list(chain.from_iterable(books))
+        sources.extend(([name], fnames, lnames, compress(members, member_kinds), titles))
+        tables.append((name, keys, fnames, lnames, list(map(itemgetter('age'), patrons)),
+            members, member_kinds, list(map(len, books)), titles, others))
+
+    # every distinct string once, in order of first use
+    string_list = list(dict.fromkeys(chain.from_iterable(sources)))
+    index = dict(zip(string_list, range(len(string_list))))
+    ref = index.__getitem__
+
+    text = SEPARATOR.join(string_list)
+    separated = not string_list or text.count(SEPARATOR) == len(string_list) - 1
+    if not separated:
+        text = ''.join(string_list)
+    encoded_text = text.encode('utf-8', 'surrogatepass')
+    parts = [MAGIC, struct.pack('<BBII', VERSION, separated, len(string_list),
+        len(encoded_text))]
+    if not separated:
+        parts.append(_pack_array('I', map(len, string_list)))
+    parts.append(encoded_text)
+    parts.append(struct.pack('<I', len(tables)))
+    for name, keys, fnames, lnames, ages, members, member_kinds, counts, titles, others in tables:
+        if MEMBER_ID_STR in member_kinds:
+            members = [ref(member) if kind == MEMBER_ID_STR else member
+                for member, kind in zip(members, member_kinds)]
+        parts.append(struct.pack('<III', ref(name), len(keys), len(titles)))
+        parts.append(_pack_array('I', map(int, keys)))
+        parts.append(_pack_array('I', map(ref, fnames)))
+        parts.append(_pack_array('I', map(ref, lnames)))
+        parts.append(_pack_array('q', ages))
+        parts.append(_pack_array('B', member_kinds))
+        parts.append(_pack_array('q', members))
+        parts.append(_pack_array('I', counts))
+        parts.append(_pack_array('I', map(ref, titles)))
+        other_data = json.dumps(others, separators=(',', ':')).encode('utf-8') if others else b''
+        parts.append(struct.pack('<I', len(other_data)))
+        parts.append(other_data)
+    return b''.join(parts)
+
+
+def _read_strings(reader):
+    """Reads the string table, split in one call when it was written separated."""
+    version, separated, string_count, text_size = struct.unpack('<BBII', reader.take(10))
+    if version != VERSION:
+        raise InvalidBinaryFileException("Unsupported binary patron version %d" % version)
+    lengths = None if separated else reader.array('I', string_count)
+    text = reader.take(text_size).decode('utf-8', 'surrogatepass')
+    if not string_count:
+        return []
+    if separated:
+        strings = text.split(SEPARATOR)
+        if len(strings) != string_count:
+            raise InvalidBinaryFileException("Corrupt binary patron string table")
+        return strings
+    offsets = [0]
+    offsets.extend(accumulate(lengths))
+    return [text[offsets[i]:offsets[i + 1]] for i in range(string_count)]
+
+
+def decode(data):
+    """Decodes bytes in the binary patron format back into TinyDB data.
+
+    The columns are turned into documents in bulk with map and zip, with the
+    garbage collector paused, which is what makes opening a large table faster
+    than json.loads.
+
+    :param data: the encoded bytes
+    :returns: the TinyDB data, with document IDs as string keys like db.json
+    """
+    reader = _Reader(data)
+    if reader.take(4) != MAGIC:
+        raise InvalidBinaryFileException("Not a binary patron file")
+    strings = _read_strings(reader)
+    lookup = strings.__getitem__
+
+    result = {}
+    # the documents hold no reference cycles, so the collections their
+    # allocations would trigger only rescan them; pause them while decoding
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(reader.u32()):
+            name_ref, count, book_count = struct.unpack('<III', reader.take(12))
+            ids = reader.array('I', count)
+            fnames = map(lookup, reader.array('I', count))
+            lnames = map(lookup, reader.array('I', count))
+            ages = reader.array('q', count)
+            member_kinds = reader.array('B', count)
+            members = reader.array('q', count)
+            counts = reader.array('I', count)
+            titles = iter(map(lookup, reader.array('I', book_count)))
+            other_size = reader.u32()
+            others = json.loads(reader.take(other_size).decode('utf-8')) if other_size else []
+
+            if MEMBER_ID_STR not in member_kinds:
+                member_ids = members
+            elif MEMBER_ID_INT not in member_kinds:
+                member_ids = map(lookup, members)
+            else:
+                member_ids = [lookup(member) if kind == MEMBER_ID_STR else member
+                    for member, kind in zip(members, member_kinds)]
+            borrowed = map(list, map(islice, repeat(titles), counts))
+            rows = zip(fnames, lnames, ages, member_ids, borrowed)
+            docs = list(zip(map(str, ids), map(dict, map(zip, repeat(PATRON_FIELDS), rows))))
+            for position, key, doc in others:
+                docs.insert(position, (key, doc))
+            result[strings[name_ref]] = dict(docs)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return result
+
+
+class BinaryStorage(Storage):
+    """TinyDB storage writing the binary patron format.
+
+    Use it with Library_DB(storage=BinaryStorage) or TinyDB(path, storage=BinaryStorage).
+    """
+
+    def __init__(self, path, create_dirs=False, fsync=False, **kwargs):
+        """Constructor for the BinaryStorage class, creates the file if needed.
+
+        :param path: the path of the binary database file
+        :param create_dirs: whether to create missing parent directories
+        :param fsync: whether to fsync after every write, off like JSONStorage
+        """
+        super(BinaryStorage, self).__init__()
+        touch(path, create_dirs=create_dirs)
+        self.fsync = fsync
+        self._handle = open(path, 'r+b')
+
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        return decode(self._handle.read())
+
+    def write(self, data):
+        self._handle.seek(0)
+        self._handle.write(encode(data))
+        self._handle.flush()
+        if self.fsync:
+            os.fsync(self._handle.fileno())
+        self._handle.truncate()
+
+    def close(self):
+        self._handle.close()
+
+
+def _convert(source, destination):
+    try:
+        data = source.read()
+        destination.write(data if data is not None else {})
+    finally:
+        source.close()
+        destination.close()
+
+
+def convert_json_to_binary(json_path, binary_path):
+    """Migrates a db.json file to the binary patron format.
+
+    :param json_path: the existing JSON database file
+    :param binary_path: the binary file to write
+    """
+    _convert(JSONStorage(json_path), BinaryStorage(binary_path))
+
+
+def convert_binary_to_json(binary_path, json_path):
+    """Rolls a binary patron file back to the db.json format.
+
+    :param binary_path: the existing binary database file
+    :param json_path: the JSON file to write
+    """
+    _convert(BinaryStorage(binary_path), JSONStorage(json_path))
+
+
+def main(argv=None):
+    """Command line entry point for migrating between the two formats."""
+    parser = argparse.ArgumentParser(description='Convert between db.json and binary patron files')
+    parser.add_argument('direction', choices=['to-binary', 'to-json'])
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args(argv)
+    if args.direction == 'to-binary':
+        convert_json_to_binary(args.source, args.destination)
+    else:
+        convert_binary_to_json(args.source, args.destination)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Filename: cache_warmer.py
+Description: background prefetching of OpenLibrary responses for the titles
+patrons currently hold
+"""
+
+import threading
+import time
+from collections import Counter
+
+from library import metrics
+from library.ext_api_interface import Books_API
+from library.rate_limiter import RateLimiter
+from library.resilience import RetryPolicy
+
+
+def rank_borrowed_titles(patrons):
+    """Ranks borrowed titles by the number of patrons holding them.
+
+    :param patrons: the patrons, as returned by Library_DB.get_all_patrons
+    :returns: a list of titles, most held first, ties in alphabetical order
+    """
+    counts = Counter(title for patron in patrons for title in patron.get('borrowed_books', []))
+    return sorted(counts, key=lambda title: (-counts[title], title))
+
+
+class CacheWarmer(threading.Thread):
+    """Daemon thread filling a Books_API response cache ahead of real traffic.
+
+    Each title is fetched with the same search_url('q', ...) URL used by
+    get_ebooks and get_book_info, so a single request covers is_ebook,
+    get_ebooks_count and get_languages_for_book. Requests go through the batch
+    lane of the rate limiter and share the circuit breaker of the given client.
+    Each title gets a single attempt, a failed one is fetched on demand later.
+    """
+
+    def __init__(self, api, titles, max_titles=100, max_seconds=None, delay=0.0):
+        """Constructor for the CacheWarmer class, call start() to begin.
+
+        :param api: the Books_API whose cache is warmed, it must have a cache
+        :param titles: the titles to prefetch, in priority order
+        :param max_titles: the maximum number of titles fetched
+        :param max_seconds: optional time budget for the whole run
+        :param delay: seconds to pause between requests
+        """
+        super(CacheWarmer, self).__init__(name='library-cache-warmer', daemon=True)
+        if api.cache is None:
+            raise ValueError("CacheWarmer needs a Books_API with a response cache")
+        self.api = Books_API(api_url=api.API_URL, cache=api.cache, breaker=api.breaker,
+            retry=RetryPolicy(max_retries=0), priority='batch')
+        # tokens are taken by run() with timeouts, so cancel() is not stuck behind
+        # interactive traffic
+        self.rate_limiter = api.rate_limiter
+        self.api.rate_limiter = None
+        self.titles = list(titles)[:max_titles]
+        self.max_seconds = max_seconds
+        self.delay = delay
+        self.warmed = []
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_db(cls, db, api, **kwargs):
+        """Creates a warmer for the titles held by the patrons in the database.
+
+        The patrons are read on the calling thread, so the warmer thread itself
+        never touches the database.
+
+        :param db: the Library_DB to read patrons from
+        :param api: the Books_API whose cache is warmed
+        :param kwargs: the max_titles, max_seconds and delay options
+        :returns: a CacheWarmer object, not started yet
+        """
+        return cls(api, rank_borrowed_titles(db.get_all_patrons()), **kwargs)
+
+    @property
+    def cancelled(self):
+        """True once cancel() has been called."""
+        return self._cancelled.is_set()
+
+    def cancel(self, timeout=None):
+        """Stops the warmer after the request in flight and waits for it.
+
+        A warmer waiting for a rate limiter token stops within 0.1 seconds, but
+        a request already sent is not interrupted, so without a timeout this can
+        wait up to Books_API.CONNECT_TIMEOUT + Books_API.READ_TIMEOUT.
+
+        :param timeout: optional maximum number of seconds to wait
+        """
+        self._cancelled.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        """Prefetches the titles until done, cancelled or out of time."""
+        deadline = time.monotonic() + self.max_seconds if self.max_seconds is not None else None
+        for title in self.titles:
+            if self._cancelled.is_set():
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            request_url = self.api.search_url('q', title)
+            if self.api.cache.get(request_url) is None:
+                if not self._acquire_token(deadline):
+                    break
+                if self.api.make_request(request_url) is not None:
+                    metrics.registry.increment('cache_warmer.prefetched')
+            self.warmed.append(title)
+            if self.delay and self._cancelled.wait(self.delay):
+                break
+
+    def _acquire_token(self, deadline):
+        """Waits for a batch lane token in short slices, giving up when cancelled.
+
+        :param deadline: the time.monotonic() value to give up at, or None
+        :returns: True once a token was taken, False if cancelled or out of time
+        """
+        if self.rate_limiter is None:
+            return True
+        while not self._cancelled.is_set():
+            timeout = 0.1
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    return False
+            if self.rate_limiter.acquire(RateLimiter.BATCH, timeout=timeout):
+                return True
+        return False
@@ -0,0 +1,207 @@
+"""
+Filename: change_feed.py
+Description: ordered feed of patron mutations for incremental consumers
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+from library import metrics
+
+
+class ChangeFeed:
+    """Sequenced log of patron changes, pushed to subscribers and readable by offset.
+
+    Every event is a dictionary with 'seq', 'kind', 'time', 'memberID' and
+    'patron' keys, plus 'doc_id' or 'book' depending on the kind. Sequence
+    numbers start at 1 and have no gaps, so a consumer only needs to remember
+    the last one it processed. With a journal file, events are appended as
+    JSON lines and the sequence survives restarts; without one, the last
+    max_events events are kept in memory.
+    """
+
+    def __init__(self, journal_path=None, max_events=10000, fsync=False):
+        """Constructor for the ChangeFeed class.
+
+        :param journal_path: optional JSON lines file the events are appended to
+        :param max_events: the number of events kept in memory without a journal
+        :param fsync: whether to fsync the journal after every event
+        """
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._subscribers = []
+        # events waiting for delivery, and whether a thread is delivering them
+        self._pending = collections.deque()
+        self._delivering = False
+        self._events = collections.deque(maxlen=max_events)
+        self._offsets = []
+        self._sequence = 0
+        self._journal = None
+        if journal_path:
+            self._open_journal()
+
+    @property
+    def last_sequence(self):
+        """The sequence number of the latest event, 0 if there is none."""
+        return self._sequence
+
+    def subscribe(self, callback):
+        """Calls callback with each new event, in sequence order.
+
+        Callbacks run outside the feed's lock, so they may call read_from,
+        publish or unsubscribe. One thread delivers at a time: events published
+        meanwhile, including by a callback, are delivered by that thread after
+        the current one. Exceptions raised by a subscriber are swallowed so they
+        cannot fail the database write that produced the event.
+
+        :param callback: a function taking the event dictionary
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stops calling a subscribed callback.
+
+        :param callback: the function passed to subscribe
+        """
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, kind, patron, **details):
+        """Records a change and hands it to the journal and subscribers.
+
+        The database write has already happened when this is called, so a
+        failed journal write does not raise: the event is dropped without using
+        up a sequence number and 'change_feed.journal_errors' is incremented.
+
+        :param kind: the operation, e.g. 'insert_patron' or 'borrow_book'
+        :param patron: the patron data after the change
+        :param details: extra event fields, e.g. doc_id or book
+        :returns: the event dictionary, None if the journal write failed
+        """
+        with self._lock:
+            event = {'seq': self._sequence + 1, 'kind': kind, 'time': time.time(),
+                'memberID': patron.get('memberID'), 'patron': patron}
+            event.update(details)
+            if self._journal is not None:
+                try:
+                    self._append(event)
+                except OSError:
+                    metrics.registry.increment('change_feed.journal_errors', kind=kind)
+                    return None
+            else:
+                self._events.append(event)
+            self._sequence = event['seq']
+            self._pending.append(event)
+            deliver = not self._delivering
+            self._delivering = True
+        metrics.registry.increment('change_feed.events', kind=kind)
+        if deliver:
+            self._deliver()
+        return event
+
+    def read_from(self, offset, limit=None):
+        """Gets the events after the given sequence number.
+
+        :param offset: the last sequence number already processed, 0 for all
+        :param limit: optional maximum number of events returned
+        :returns: a list of events in sequence order
+        :raises LookupError: if events after offset are no longer kept in memory
+        """
+        with self._lock:
+            if self._journal is not None:
+                return self._read_journal(offset, limit)
+            events = list(self._events)
+        if events and offset < events[0]['seq'] - 1:
+            raise LookupError("Events after %d are no longer available" % offset)
+        start = max(0, offset - events[0]['seq'] + 1) if events else 0
+        end = start + limit if limit is not None else None
+        return events[start:end]
+
+    def close(self):
+        """Closes the journal file."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _deliver(self):
+        """Hands the pending events to the subscribers until none are left."""
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._delivering = False
+                        return
+                    event = self._pending.popleft()
+                    subscribers = list(self._subscribers)
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception:
+                        metrics.registry.increment('change_feed.subscriber_errors')
+        except BaseException:
+            with self._lock:
+                self._delivering = False
+            raise
+
+    def _open_journal(self):
+        """Opens the journal, indexing the byte offset of every existing event."""
+        self._journal = open(self.journal_path, 'a+b')
+        self._journal.seek(0)
+        position = 0
+        for line in self._journal:
+            if not line.endswith(b'\n'):
+                # partial write from a crash, drop it
+                self._journal.truncate(position)
+                break
+            self._offsets.append(position)
+            position += len(line)
+        if self._offsets:
+            self._journal.seek(self._offsets[-1])
+            self._sequence = json.loads(self._journal.readline().decode('utf-8'))['seq']
+        self._journal.seek(0, os.SEEK_END)
+
+    def _append(self, event):
+        """Writes an event to the journal, indexing it only once it is written."""
+        line = json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n'
+        self._journal.seek(0, os.SEEK_END)
+        position = self._journal.tell()
+        try:
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+        except OSError:
+            self._rewind_journal(position)
+            raise
+        self._offsets.append(position)
+
+    def _rewind_journal(self, position):
+        """Drops a partly written event, reopening the file to discard its buffer."""
+        try:
+            self._journal.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.journal_path, position)
+        except OSError:
+            pass
+        self._journal = open(self.journal_path, 'a+b')
+
+    def _read_journal(self, offset, limit):
+        first_seq = self._sequence - len(self._offsets) + 1
+        start = max(0, offset - first_seq + 1)
+        end = len(self._offsets) if limit is None else min(len(self._offsets), start + limit)
+        if start >= end:
+            return []
+        self._journal.seek(self._offsets[start])
+        events = [json.loads(self._journal.readline().decode('utf-8'))
+            for _ in range(end - start)]
+        self._journal.seek(0, os.SEEK_END)
+        return events
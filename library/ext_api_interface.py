@@ -3,26 +3,179 @@ Filename: ext_api_interface.py
 Description: module used for interacting with a web service
 """
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+
 import requests
 
+from library import metrics, tracing
+from library.resilience import CircuitBreaker, RetryPolicy
+
 class Books_API:
     """Class used for interacting with the OpenLibrary API."""
 
     API_URL = "http://openlibrary.org/search.json"
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 10.0
+    # status codes worth retrying, anything else is returned as None right away
+    TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    # optional RateLimiter shared by every instance in the process
+    rate_limiter = None
+    _hedge_executor = None
+    _hedge_lock = threading.Lock()
+
+    def __init__(self, api_url=None, cache=None, breaker=None, retry=None, hedge_after=None,
+            priority='interactive'):
+        """Constructor for the Books_API class.
 
+        :param api_url: optional search endpoint overriding API_URL, e.g. a local
+            FakeOpenLibraryServer
+        :param cache: optional ResponseCache; fresh entries are returned without a
+            request and stale ones are served while the breaker is open
+        :param breaker: optional CircuitBreaker, pass the same one to share it
+        :param retry: optional RetryPolicy, defaults to 2 jittered retries
+        :param hedge_after: if set, the seconds after which a second identical
+            request is sent when the first has not answered yet
+        :param priority: the rate limiter lane, 'interactive' or 'batch'
+        """
+        if api_url:
+            self.API_URL = api_url
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.retry = retry or RetryPolicy()
+        self.hedge_after = hedge_after
+        self.priority = priority
+
+    @tracing.traced('books_api.make_request')
     def make_request(self, url):
         """Makes a HTTP request to the given URL.
+
+        Transient failures (connection errors, timeouts and 429/5xx responses) are
+        retried with backoff. While the circuit breaker is open no request is
+        made and the stale cached response, if any, is returned.
         
         :param url: the url used for the HTTP request
         :returns: the JSON body of the request, None if non 200 status code or ConnectionError
         """
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+        if not self.breaker.allow_request():
+            metrics.registry.increment('books_api.short_circuited')
+            return self._stale(url)
         try:
-            response = requests.get(url)
+            for retry in range(self.retry.max_retries + 1):
+                if retry:
+                    metrics.registry.increment('books_api.retries')
+                    self.retry.wait(retry - 1)
+                json_data, transient = self._fetch(url)
+                if not transient:
+                    break
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # interrupted, neither a success nor a failure of the upstream
+            self.breaker.release_trial()
+            raise
+        if transient:
+            self.breaker.record_failure()
+            return self._stale(url)
+        self.breaker.record_success()
+        if json_data is not None and self.cache is not None:
+            self.cache.put(url, json_data)
+        return json_data
+
+    def search_url(self, field, value):
+        """Builds the search.json URL for a query.
+
+        OpenLibrary matches queries case-insensitively, so the value is lowercased
+        and the same query always maps to the same URL and response cache entry.
+
+        :param field: the search parameter, 'q' or 'author'
+        :param value: the searched text
+        :returns: the request URL
+        """
+        return "%s?%s=%s" % (self.API_URL, field, value.lower())
+
+    def _stale(self, url):
+        """Gets the stale cached response for a URL, or None without a cache."""
+        if self.cache is None:
+            return None
+        return self.cache.get_stale(url)
+
+    def _fetch(self, url):
+        """Performs one attempt, hedged with a second request if configured.
+
+        :param url: the url used for the HTTP request
+        :returns: a tuple of the JSON body or None, and whether the failure is transient
+        """
+        if self.hedge_after is None:
+            return self._attempt(url)
+        with Books_API._hedge_lock:
+            if Books_API._hedge_executor is None:
+                Books_API._hedge_executor = ThreadPoolExecutor(
+                    thread_name_prefix='books-api-hedge')
+        # the attempts run on executor threads, keep their spans under make_request
+        attempt = tracing.propagate(self._attempt)
+        pending = {Books_API._hedge_executor.submit(attempt, url)}
+        done, _ = wait(pending, timeout=self.hedge_after)
+        if not done:
+            metrics.registry.increment('books_api.hedged')
+            pending.add(Books_API._hedge_executor.submit(attempt, url))
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not result[1]:
+                    return result
+        return result
+
+    def _attempt(self, url):
+        """Sends a single HTTP request with connect and read timeouts.
+
+        :param url: the url used for the HTTP request
+        :returns: a tuple of the JSON body or None, and whether the failure is transient
+        """
+        if self.rate_limiter is not None:
+            with tracing.span('books_api.rate_limit', lane=self.priority):
+                self.rate_limiter.acquire(self.priority)
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            with tracing.span('books_api.http', url=url):
+                response = requests.get(url, timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT))
+            status = str(response.status_code)
             if response.status_code != 200:
-                return None
-            return response.json()
+                return None, response.status_code in self.TRANSIENT_STATUS_CODES
+            with tracing.span('books_api.decode'):
+                return response.json(), False
+        except requests.Timeout:
+            status = 'timeout'
+            return None, True
         except requests.ConnectionError:
-            return None
+            return None, True
+        finally:
+            if metrics.registry.enabled:
+                self._record_request(url, status, time.perf_counter() - start)
+
+    def _record_request(self, url, status, elapsed):
+        """Records the metrics for one HTTP request.
+
+        :param url: the requested url
+        :param status: the HTTP status code as a string, 'timeout' or 'error'
+        :param elapsed: the time taken in seconds
+        """
+        endpoint = urlparse(url).path or '/'
+        metrics.registry.increment('books_api.requests', endpoint=endpoint, status=status)
+        if status != '200':
+            metrics.registry.increment('books_api.errors', endpoint=endpoint, status=status)
+        metrics.registry.observe('books_api.latency', elapsed, endpoint=endpoint, status=status)
 
     def is_book_available(self, book):
         """Determines if a given book is available to borrow.
@@ -30,11 +183,9 @@ class Books_API:
         :param book: the title of the book
         :returns: True if available, False if not
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
+        request_url = self.search_url('q', book)
         json_data = self.make_request(request_url)
-        if json_data and len(json_data['docs']) >= 1:
-            return True
-        return False
+        return self._parse_book_available(json_data)
 
     def books_by_author(self, author):
         """Gets all the books written by a given author.
@@ -42,36 +193,20 @@ class Books_API:
         :param author: the name of the author
         :returns: the titles of all the books in a list form
         """
-        request_url = "%s?author=%s" % (self.API_URL, author)
+        request_url = self.search_url('author', author)
         json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        books = []
-        for book in json_data['docs']:
-            books.append(book['title_suggest'])
-        return books
+        return self._parse_books_by_author(json_data)
 
+    @tracing.traced('books_api.get_book_info')
     def get_book_info(self, book):
         """Gets the information for a given book.
         
         :param book: the title of the book
         :returns: a list of dictionaries with book data
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
+        request_url = self.search_url('q', book)
         json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        books_info = []
-        for book in json_data['docs']:
-            info = {'title': book['title']}
-            if 'publisher' in book:
-                info.update({'publisher': book['publisher']})
-            if 'publish_year' in book:
-                info.update({'publish_year': book['publish_year']})
-            if 'language' in book:
-                info.update({'language': book['language']})
-            books_info.append(info)
-        return books_info
+        return self._parse_book_info(json_data)
 
     def get_ebooks(self, book):
         """Gets the ebooks for a given book.
@@ -79,8 +214,43 @@ class Books_API:
         :param book: the title of the book
         :returns: data about the ebooks
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
+        request_url = self.search_url('q', book)
         json_data = self.make_request(request_url)
+        return self._parse_ebooks(json_data)
+
+    # The parsers below turn a search.json body into the results of the public
+    # methods, they are shared with AsyncBooks_API.
+
+    def _parse_book_available(self, json_data):
+        if json_data and len(json_data['docs']) >= 1:
+            return True
+        return False
+
+    def _parse_books_by_author(self, json_data):
+        if not json_data:
+            return []
+        books = []
+        for book in json_data['docs']:
+            books.append(book['title_suggest'])
+        return books
+
+    def _parse_book_info(self, json_data):
+        if not json_data:
+            return []
+        books_info = []
+        with tracing.span('books_api.parse_docs', docs=len(json_data['docs'])):
+            for book in json_data['docs']:
+                info = {'title': book['title']}
+                if 'publisher' in book:
+                    info.update({'publisher': book['publisher']})
+                if 'publish_year' in book:
+                    info.update({'publish_year': book['publish_year']})
+                if 'language' in book:
+                    info.update({'language': book['language']})
+                books_info.append(info)
+        return books_info
+
+    def _parse_ebooks(self, json_data):
         if not json_data:
             return []
         ebooks = []
@@ -0,0 +1,237 @@
+"""
+Filename: fake_openlibrary.py
+Description: local stand-in for the OpenLibrary search endpoint, used for
+load testing and benchmarking Books_API without hitting openlibrary.org
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+LANGUAGES = ['eng', 'fre', 'ger', 'spa', 'rus', 'swe', 'ita', 'jpn']
+WORDS = ['lord', 'rings', 'hobbit', 'silent', 'river', 'night', 'garden', 'winter',
+    'shadow', 'empire', 'ocean', 'stone', 'crown', 'forest', 'glass', 'machine']
+AUTHORS = ['J.R.R. Tolkien', 'Ursula K. Le Guin', 'Octavia Butler', 'Terry Pratchett',
+    'Iain M. Banks', 'Mary Shelley']
+
+
+def fixed_latency(seconds):
+    """Latency distribution that always returns the same delay.
+
+    :param seconds: the delay in seconds
+    :returns: a callable taking a random.Random and returning a delay
+    """
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    """Latency distribution drawn uniformly from [low, high].
+
+    :param low: the minimum delay in seconds
+    :param high: the maximum delay in seconds
+    :returns: a callable taking a random.Random and returning a delay
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma):
+    """Long-tailed latency distribution, closer to real network behavior.
+
+    :param median: the median delay in seconds
+    :param sigma: the standard deviation of the underlying normal distribution
+    :returns: a callable taking a random.Random and returning a delay
+    """
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def generate_docs(count, seed=0):
+    """Generates OpenLibrary-like search docs.
+
+    :param count: the number of docs to generate
+    :param seed: the seed used so the same docs are produced on every run
+    :returns: a list of doc dictionaries
+    """
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        doc = {
+            'title': title,
+            'title_suggest': title,
+            'author_name': [rng.choice(AUTHORS)],
+            'ebook_count_i': rng.choice([0, 0, 1, 2, 5]),
+        }
+        if rng.random() < 0.9:
+            doc['publisher'] = ['Publisher %d' % rng.randint(1, 50)
+                for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.9:
+            doc['publish_year'] = sorted(rng.randint(1900, 2023) for _ in range(rng.randint(1, 5)))
+        if rng.random() < 0.8:
+            doc['language'] = rng.sample(LANGUAGES, rng.randint(1, 3))
+        docs.append(doc)
+    return docs
+
+
+class FakeOpenLibraryServer:
+    """Local HTTP server serving /search.json with injectable latency and failures."""
+
+    def __init__(self, docs=None, latency=None, error_rate=0.0, error_status=503,
+            chunk_size=None, chunk_delay=0.0, seed=None, host='127.0.0.1', port=0):
+        """Constructor for the FakeOpenLibraryServer class.
+
+        :param docs: the docs to search over, defaults to generate_docs(100)
+        :param latency: a callable taking a random.Random and returning the delay in
+            seconds before each response is sent, see fixed_latency and friends
+        :param error_rate: the fraction of requests answered with error_status
+        :param error_status: the HTTP status code used for injected errors
+        :param chunk_size: if set, the body is streamed in chunks of this many bytes
+        :param chunk_delay: the delay in seconds between streamed chunks
+        :param seed: the seed for latency and error sampling
+        :param host: the interface to bind to
+        :param port: the port to bind to, 0 picks a free one
+        """
+        self.docs = docs if docs is not None else generate_docs(100)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.request_count = 0
+        self.error_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """The search endpoint URL, suitable for Books_API(api_url=...)."""
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d/search.json" % (host, port)
+
+    def start(self):
+        """Starts serving requests on a background thread.
+
+        :returns: the server itself
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server and releases the port."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def search(self, params):
+        """Builds the search.json body for the given query parameters.
+
+        :param params: the parsed query string, as returned by parse_qs
+        :returns: the response body as a dictionary
+        """
+        docs = self.docs
+        if 'q' in params:
+            term = params['q'][0].lower()
+            docs = [doc for doc in docs if term in doc['title'].lower()]
+        if 'author' in params:
+            author = params['author'][0].lower()
+            docs = [doc for doc in docs
+                if any(author in name.lower() for name in doc.get('author_name', []))]
+        return {'numFound': len(docs), 'start': 0, 'docs': docs}
+
+    def _sample(self):
+        """Draws the delay and error decision for one request."""
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency(self._rng) if self.latency else 0.0
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return delay, failed
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path != '/search.json':
+                    self._send(404, b'{"error": "not found"}')
+                    return
+                delay, failed = server._sample()
+                if delay > 0:
+                    time.sleep(delay)
+                if failed:
+                    self._send(server.error_status, b'{"error": "injected failure"}')
+                    return
+                body = json.dumps(server.search(parse_qs(parsed.query))).encode('utf-8')
+                self._send(200, body)
+
+            def _send(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not server.chunk_size:
+                    self.wfile.write(body)
+                    return
+                for start in range(0, len(body), server.chunk_size):
+                    self.wfile.write(body[start:start + server.chunk_size])
+                    self.wfile.flush()
+                    time.sleep(server.chunk_delay)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    """Runs the fake server in the foreground until interrupted."""
+    parser = argparse.ArgumentParser(description='Fake OpenLibrary search server')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--docs', type=int, default=100, help='number of generated docs')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='median latency')
+    parser.add_argument('--sigma', type=float, default=0.0, help='lognormal spread, 0 for fixed')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--chunk-delay-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    latency = None
+    if args.latency_ms > 0:
+        median = args.latency_ms / 1000.0
+        latency = lognormal_latency(median, args.sigma) if args.sigma else fixed_latency(median)
+    server = FakeOpenLibraryServer(docs=generate_docs(args.docs, args.seed), latency=latency,
+        error_rate=args.error_rate, chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay_ms / 1000.0, seed=args.seed, port=args.port)
+    print("Serving %s" % server.url)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
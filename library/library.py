@@ -3,47 +3,150 @@ Filename: library.py
 Description: Library class used for SWEN-352 mocking activity.
 """
 
+import importlib
+from collections import Counter
+
+from library import metrics, tracing
 from library.patron import Patron
-from library.library_db_interface import Library_DB
-from library.ext_api_interface import Books_API
+from library.title_index import TitleIndex
+
+# Library_DB, Books_API and CacheWarmer pull in tinydb and requests, so they are
+# imported on first use instead of at module load
+_LAZY_IMPORTS = {
+    'Library_DB': 'library.library_db_interface',
+    'Books_API': 'library.ext_api_interface',
+    'CacheWarmer': 'library.cache_warmer',
+    'ResponseCache': 'library.response_cache',
+}
+
+def __getattr__(name):
+    """Imports the classes in _LAZY_IMPORTS when they are first looked up."""
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name])
+        return getattr(module, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def _resolve(name):
+    """Gets a lazily imported class, honoring anything patched onto this module."""
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
+
+# The helpers below turn Books_API results into the results of the API methods,
+# they are shared with AsyncLibrary.
+
+def _has_ebook(ebooks, book):
+    book = book.lower()
+    for ebook in ebooks:
+        if book == ebook['title'].lower():
+            return True
+    return False
+
+def _count_ebooks(ebooks):
+    ebook_count = 0
+    for ebook in ebooks:
+        ebook_count += ebook['ebook_count']
+    return ebook_count
+
+def _has_title(titles, book):
+    for title in titles:
+        if book.lower() == title.lower():
+            return True
+    return False
+
+def _collect_languages(books_info):
+    lang_set = set()
+    for book in books_info:
+        if 'language' in book:
+            lang_set.update(book['language'])
+    return lang_set
 
 class Library:
     """Class used to represent a library."""
 
     def __init__(self):
-        """Constructor for the Library class."""
-        self.db = Library_DB()
-        self.api = Books_API()
+        """Constructor for the Library class.
+
+        The database and API clients are created on first use.
+        """
+        self._db = None
+        self._api = None
+        # built from the borrowed books in the DB on first autocomplete lookup
+        self._title_index = None
+
+    @property
+    def db(self):
+        """The Library_DB, opened on first access."""
+        if self._db is None:
+            self._db = _resolve('Library_DB')()
+        return self._db
+
+    @db.setter
+    def db(self, value):
+        self._db = value
+
+    @property
+    def api(self):
+        """The Books_API client, created on first access."""
+        if self._api is None:
+            self._api = _resolve('Books_API')()
+        return self._api
+
+    @api.setter
+    def api(self, value):
+        self._api = value
+
+    @property
+    def title_index(self):
+        """The TitleIndex of borrowed books, built on first access."""
+        if self._title_index is None:
+            self._title_index = TitleIndex.build(self.db.get_all_patrons())
+        return self._title_index
+
+    def start_cache_warmer(self, max_titles=100, max_seconds=None, delay=0.0):
+        """Starts prefetching OpenLibrary results for the titles patrons hold.
+
+        Gives the API client a ResponseCache if it has none, so later calls to
+        is_ebook, get_ebooks_count and get_languages_for_book are served from it.
+        
+        :param max_titles: the maximum number of titles fetched
+        :param max_seconds: optional time budget for the whole run
+        :param delay: seconds to pause between requests
+        :returns: the started CacheWarmer, call cancel() on it to stop early
+        """
+        if self.api.cache is None:
+            self.api.cache = _resolve('ResponseCache')()
+        warmer = _resolve('CacheWarmer').from_db(self.db, self.api, max_titles=max_titles,
+            max_seconds=max_seconds, delay=delay)
+        warmer.start()
+        return warmer
 
     ############################################################################
     ################################ API METHODS ###############################
     ############################################################################
 
+    @metrics.instrument('library.is_ebook')
+    @tracing.traced('library.is_ebook')
     def is_ebook(self, book):
         """Checks if the book is an e-book.
         
         :param book: the title of the book
         :returns: True if yes, False if not
         """
-        ebooks = self.api.get_ebooks(book)
-        book = book.lower()
-        for ebook in ebooks:
-            if book == ebook['title'].lower():
-                return True
-        return False
+        return _has_ebook(self.api.get_ebooks(book), book)
 
+    @metrics.instrument('library.get_ebooks_count')
+    @tracing.traced('library.get_ebooks_count')
     def get_ebooks_count(self, book):
         """Gets the number of ebooks for a given book.
         
         :param book: the title of the book
         :returns: the number of ebooks
         """
-        ebooks = self.api.get_ebooks(book)
-        ebook_count = 0
-        for ebook in ebooks:
-            ebook_count += ebook['ebook_count']
-        return ebook_count
+        return _count_ebooks(self.api.get_ebooks(book))
 
+    @metrics.instrument('library.is_book_by_author')
+    @tracing.traced('library.is_book_by_author')
     def is_book_by_author(self, author, book):
         """Determines if the book was written by a given author.
         
@@ -51,29 +154,24 @@ class Library:
         :param book: the name of the book
         :returns: True if the book was written by the author, False if not
         """
-        results = self.api.books_by_author(author)
-        for result in results:
-            if book.lower() == result.lower():
-                return True
-        return False
+        return _has_title(self.api.books_by_author(author), book)
 
+    @metrics.instrument('library.get_languages_for_book')
+    @tracing.traced('library.get_languages_for_book')
     def get_languages_for_book(self, book):
         """Get the available languages for a given book.
         
         :param book: the title of the book
         :returns: the set of languages the book is available in
         """
-        books_info = self.api.get_book_info(book)
-        lang_set = set()
-        for book in books_info:
-            if 'language' in book:
-                lang_set.update(book['language'])
-        return lang_set
+        return _collect_languages(self.api.get_book_info(book))
 
     ############################################################################
     ################################# DB METHODS ###############################
     ############################################################################
 
+    @metrics.instrument('library.register_patron')
+    @tracing.traced('library.register_patron')
     def register_patron(self, fname, lname, age, memberID):
         """Registers a Patron with the library and adds them to the database.
         
@@ -86,6 +184,8 @@ class Library:
         patron = Patron(fname, lname, age, memberID)
         return self.db.insert_patron(patron)
 
+    @metrics.instrument('library.is_patron_registered')
+    @tracing.traced('library.is_patron_registered')
     def is_patron_registered(self, patron):
         """Determines if the Patron is already registered in the database.
         
@@ -97,24 +197,49 @@ class Library:
             return True
         return False
 
+    @metrics.instrument('library.borrow_book')
+    @tracing.traced('library.borrow_book')
     def borrow_book(self, book, patron):
         """Borrows a book for a Patron.
         
         :param book: the title of the book
         :param patron: the Patron object
         """
-        patron.add_borrowed_book(book.lower())
-        self.db.update_patron(patron)
+        book = book.lower()
+        patron.add_borrowed_book(book)
+        self._update_borrowed_books(patron, 'borrow_book', book)
 
+    @metrics.instrument('library.return_borrowed_book')
+    @tracing.traced('library.return_borrowed_book')
     def return_borrowed_book(self, book, patron):
         """Returns a borrowed book for a Patron.
         
         :param book: the title of the book
         :param patron: the Patron object
         """
-        patron.return_borrowed_book(book.lower())
-        self.db.update_patron(patron)
+        book = book.lower()
+        patron.return_borrowed_book(book)
+        self._update_borrowed_books(patron, 'return_borrowed_book', book)
+
+    def _update_borrowed_books(self, patron, change, book):
+        """Writes a Patron's borrowed books and keeps the title index in step.
+
+        The Patron object may not hold what is stored, e.g. one returned by
+        retrieve_patron has no borrowed books, so the index follows the stored
+        lists, which update_patron returns from before the write.
+        """
+        previous_books = self.db.update_patron(patron, change=change, book=book)
+        if self._title_index is None or not previous_books:
+            return
+        before = Counter(title for books in previous_books for title in books)
+        after = Counter(patron.get_borrowed_books() * len(previous_books))
+        for title in (before - after).elements():
+            self._title_index.remove(title)
+        for title in (after - before).elements():
+            self._title_index.add(title)
 
+    @metrics.instrument('library.is_book_borrowed')
+    @tracing.traced('library.is_book_borrowed')
     def is_book_borrowed(self, book, patron):
         """Determines if the Patron has borrowed a given book.
         
@@ -124,3 +249,25 @@ class Library:
         """
         borrowed_books = patron.get_borrowed_books()
         return book.lower() in borrowed_books
+
+    @metrics.instrument('library.complete_title')
+    @tracing.traced('library.complete_title')
+    def complete_title(self, prefix, limit=10):
+        """Autocompletes the title of a borrowed book.
+        
+        :param prefix: the start of the title
+        :param limit: the maximum number of titles returned
+        :returns: the borrowed titles starting with the prefix, alphabetically
+        """
+        return self.title_index.complete(prefix, limit)
+
+    @metrics.instrument('library.match_title')
+    @tracing.traced('library.match_title')
+    def match_title(self, text, limit=10):
+        """Finds borrowed titles matching text, tolerating typos.
+        
+        :param text: the start of the title, possibly misspelled
+        :param limit: the maximum number of titles returned
+        :returns: the closest borrowed titles, best match first
+        """
+        return self.title_index.match(text, limit)
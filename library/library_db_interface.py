@@ -3,7 +3,9 @@ Filename: library_db_interface.py
 Description: module used for interacting with the local database
 """
 
+from library import metrics, tracing
 from library.patron import Patron
+from library.patron_index import PatronIndexes
 from tinydb import TinyDB, Query
 import os
 
@@ -12,10 +14,23 @@ class Library_DB:
 
     DATABASE_FILE = 'db.json'
 
-    def __init__(self):
-        """Constructor for the Library_DB object."""
-        self.db = TinyDB(self.DATABASE_FILE)
+    def __init__(self, database_file=None, storage=None, feed=None):
+        """Constructor for the Library_DB object.
 
+        :param database_file: optional path overriding DATABASE_FILE
+        :param storage: optional TinyDB storage class, e.g. BinaryStorage
+        :param feed: optional ChangeFeed receiving every patron mutation
+        """
+        if storage:
+            self.db = TinyDB(database_file or self.DATABASE_FILE, storage=storage)
+        else:
+            self.db = TinyDB(database_file or self.DATABASE_FILE)
+        # secondary indexes, built on the first range query and then kept up to date
+        self._indexes = None
+        self.feed = feed
+
+    @metrics.instrument('library_db.insert_patron')
+    @tracing.traced('library_db.insert_patron')
     def insert_patron(self, patron):
         """Inserts a Patron into the database.
         
@@ -28,8 +43,14 @@ class Library_DB:
             return None
         data = self.convert_patron_to_db_format(patron)
         id = self.db.insert(data)
+        if self._indexes is not None:
+            self._indexes.add(id, data)
+        if self.feed is not None:
+            self.feed.publish('insert_patron', self._snapshot(data), doc_id=id)
         return id
 
+    @metrics.instrument('library_db.get_patron_count')
+    @tracing.traced('library_db.get_patron_count')
     def get_patron_count(self):
         """Gets the number of Patrons in the database.
         
@@ -38,6 +59,8 @@ class Library_DB:
         results = self.db.all()
         return len(results)
 
+    @metrics.instrument('library_db.get_all_patrons')
+    @tracing.traced('library_db.get_all_patrons')
     def get_all_patrons(self):
         """Gets a list of all the Patrons in the database.
         
@@ -46,18 +69,69 @@ class Library_DB:
         results = self.db.all()
         return results
 
-    def update_patron(self, patron):
+    @metrics.instrument('library_db.update_patron')
+    @tracing.traced('library_db.update_patron')
+    def update_patron(self, patron, change='update_patron', **details):
         """Updates a Patron's data in the DB.
         
         :param patron: the new Patron object to be updated
-        :returns: None if the patron parameter is not the correct object
+        :param change: the event kind published to the change feed, e.g.
+            'borrow_book' when the update records a borrowed book
+        :param details: extra fields for the change feed event, e.g. book
+        :returns: the borrowed books each updated record held before the update,
+            or None if the patron parameter is not the correct object
         """
         if not patron:
             return None
         query = Query()
         data = self.convert_patron_to_db_format(patron)
-        self.db.update(data, query.memberID == patron.get_memberID())
+        previous_books = []
+
+        def apply(doc):
+            # read in the same pass as the write, so callers need not search first
+            previous_books.append(list(doc.get('borrowed_books', [])))
+            doc.update(data)
+
+        updated = self.db.update(apply, query.memberID == patron.get_memberID())
+        if self._indexes is not None:
+            self._indexes.update_member(patron.get_memberID(), data)
+        if self.feed is not None and updated:
+            self.feed.publish(change, self._snapshot(data), **details)
+        return previous_books
+
+    @metrics.instrument('library_db.find_patrons_by_age')
+    @tracing.traced('library_db.find_patrons_by_age')
+    def find_patrons_by_age(self, min_age, max_age):
+        """Gets the Patrons whose age is in the given inclusive range.
+        
+        :param min_age: the youngest age included
+        :param max_age: the oldest age included
+        :returns: a list of the matching Patrons, youngest first
+        """
+        return self._get_indexes().by_age(min_age, max_age)
+
+    @metrics.instrument('library_db.find_patrons_by_lname_prefix')
+    @tracing.traced('library_db.find_patrons_by_lname_prefix')
+    def find_patrons_by_lname_prefix(self, prefix):
+        """Gets the Patrons whose last name starts with the prefix, ignoring case.
+        
+        :param prefix: the start of the last name
+        :returns: a list of the matching Patrons, ordered by last name
+        """
+        return self._get_indexes().by_lname_prefix(prefix)
+
+    def _snapshot(self, data):
+        """Copies patron data so later changes to the Patron do not alter events."""
+        return dict(data, borrowed_books=list(data['borrowed_books']))
+
+    def _get_indexes(self):
+        """Gets the secondary indexes, building them from the table on first use."""
+        if self._indexes is None:
+            self._indexes = PatronIndexes.build(self.db.all())
+        return self._indexes
 
+    @metrics.instrument('library_db.retrieve_patron')
+    @tracing.traced('library_db.retrieve_patron')
     def retrieve_patron(self, memberID):
         """Gets a Patron from the database.
         
@@ -72,6 +146,8 @@ class Library_DB:
             results[0]['memberID'])
         return None
 
+    @metrics.instrument('library_db.close_db')
+    @tracing.traced('library_db.close_db')
     def close_db(self):
         """Closes the database."""
         self.db.close()
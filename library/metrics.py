@@ -0,0 +1,199 @@
+"""
+Filename: metrics.py
+Description: lightweight metrics registry used to instrument the library
+"""
+
+import functools
+import inspect
+import threading
+import time
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Constructor for the Histogram class.
+
+        :param buckets: the sorted upper bounds of the buckets
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Records a value in the histogram.
+
+        :param value: the observed value
+        """
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        """Converts the histogram to a dictionary format.
+
+        :returns: a dictionary of the histogram's data
+        """
+        buckets = [{'le': bound, 'count': count} for bound, count in zip(self.buckets, self.counts)]
+        buckets.append({'le': None, 'count': self.counts[-1]})
+        return {'count': self.count, 'sum': self.total, 'min': self.min, 'max': self.max,
+            'buckets': buckets}
+
+
+class MetricsRegistry:
+    """Registry of counters, gauges and histograms keyed by name and labels.
+
+    The registry starts disabled, in which case every recording call returns
+    immediately.
+    """
+
+    def __init__(self, enabled=False):
+        """Constructor for the MetricsRegistry class.
+
+        :param enabled: whether metrics are recorded
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def enable(self):
+        """Starts recording metrics."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops recording metrics, already recorded values are kept."""
+        self.enabled = False
+
+    def reset(self):
+        """Discards all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def increment(self, name, value=1, **labels):
+        """Increments a counter.
+
+        :param name: the name of the counter
+        :param value: the amount to add
+        :param labels: the labels identifying the series
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Sets a gauge to the given value.
+
+        :param name: the name of the gauge
+        :param value: the current value
+        :param labels: the labels identifying the series
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """Records a value in a histogram.
+
+        :param name: the name of the histogram
+        :param value: the observed value, latencies are in seconds
+        :param labels: the labels identifying the series
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        """Gets a point-in-time copy of every recorded metric.
+
+        :returns: a JSON-serializable dictionary with 'counters', 'gauges' and
+            'histograms' lists, each entry holding its name and labels
+        """
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())]
+            gauges = [{'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._gauges.items())]
+            histograms = [dict(histogram.to_dict(), name=name, labels=dict(labels))
+                for (name, labels), histogram in sorted(self._histograms.items(),
+                    key=lambda item: item[0])]
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+registry = MetricsRegistry()
+
+
+def instrument(name, metrics=None):
+    """Decorator recording call count, error count and latency of a function.
+
+    Records the '<name>.calls' and '<name>.errors' counters and the
+    '<name>.latency' histogram. When the registry is disabled the wrapped
+    function is called directly. Coroutine functions are timed until they
+    finish, not until they return a coroutine.
+
+    :param name: the metric name prefix, e.g. 'library_db.insert_patron'
+    :param metrics: the registry to record into, defaults to the module registry
+    :returns: the decorator
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                target = metrics or registry
+                if not target.enabled:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    target.increment(name + '.errors')
+                    raise
+                finally:
+                    target.increment(name + '.calls')
+                    target.observe(name + '.latency', time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = metrics or registry
+            if not target.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                target.increment(name + '.errors')
+                raise
+            finally:
+                target.increment(name + '.calls')
+                target.observe(name + '.latency', time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+"""
+Filename: patron_analytics.py
+Description: columnar, NumPy-backed aggregations over the patron table.
+Requires numpy, which is only needed for this module.
+"""
+
+import numpy as np
+
+
+class PatronColumns:
+    """Patron table loaded into columnar arrays for vectorized reporting.
+
+    Borrowed titles are stored as integer codes into the titles list, with
+    title_offsets marking where each patron's codes start and end.
+    """
+
+    def __init__(self, ages, borrowed_counts, title_codes, titles):
+        """Constructor for the PatronColumns class, see from_patrons.
+
+        :param ages: int64 array with the age of each patron
+        :param borrowed_counts: int64 array with the number of books each patron holds
+        :param title_codes: int64 array with the borrowed title codes of all patrons
+        :param titles: the list of distinct titles, indexed by title code
+        """
+        self.ages = ages
+        self.borrowed_counts = borrowed_counts
+        self.title_codes = title_codes
+        self.title_offsets = np.concatenate(([0], np.cumsum(borrowed_counts)))
+        self.titles = titles
+
+    @classmethod
+    def from_patrons(cls, patrons):
+        """Builds the columns from patron dictionaries.
+
+        :param patrons: the patrons, as returned by Library_DB.get_all_patrons
+        :returns: a PatronColumns object
+        """
+        count = len(patrons)
+        ages = np.fromiter((patron['age'] for patron in patrons), dtype=np.int64, count=count)
+        borrowed_counts = np.fromiter((len(patron['borrowed_books']) for patron in patrons),
+            dtype=np.int64, count=count)
+        codes = {}
+        title_codes = np.fromiter((codes.setdefault(title, len(codes))
+            for patron in patrons for title in patron['borrowed_books']),
+            dtype=np.int64, count=int(borrowed_counts.sum()))
+        titles = [None] * len(codes)
+        for title, code in codes.items():
+            titles[code] = title
+        return cls(ages, borrowed_counts, title_codes, titles)
+
+    @classmethod
+    def from_db(cls, db):
+        """Builds the columns from every patron in the database.
+
+        :param db: the Library_DB or PatronSnapshot to read from
+        :returns: a PatronColumns object
+        """
+        return cls.from_patrons(db.get_all_patrons())
+
+    def __len__(self):
+        return len(self.ages)
+
+    def age_histogram(self, bins=10):
+        """Gets the distribution of patron ages.
+
+        :param bins: the number of bins or a sequence of bin edges
+        :returns: a tuple of the counts and bin edges arrays, as numpy.histogram
+        """
+        return np.histogram(self.ages, bins=bins)
+
+    def borrow_count_histogram(self):
+        """Gets how many patrons hold each number of books.
+
+        :returns: an array where index n is the number of patrons holding n books
+        """
+        return np.bincount(self.borrowed_counts)
+
+    def top_titles(self, k=10):
+        """Gets the most borrowed titles.
+
+        :param k: the number of titles to return
+        :returns: a list of (title, number of patrons holding it) tuples, most
+            borrowed first, ties broken by title
+        """
+        if not self.titles or k <= 0:
+            return []
+        counts = np.bincount(self.title_codes, minlength=len(self.titles))
+        k = min(k, len(counts))
+        threshold = np.partition(counts, len(counts) - k)[len(counts) - k]
+        candidates = np.flatnonzero(counts >= threshold)
+        ranked = sorted(candidates.tolist(), key=lambda code: (-counts[code], self.titles[code]))
+        return [(self.titles[code], int(counts[code])) for code in ranked[:k]]
+
+    def percentiles_by_age_band(self, bands, percentiles=(50, 90, 99)):
+        """Gets percentiles of the borrowed book counts for each age band.
+
+        :param bands: increasing age edges, e.g. [0, 13, 18, 65] gives the bands
+            [0, 13), [13, 18) and [18, 65)
+        :param percentiles: the percentiles to compute, between 0 and 100
+        :returns: a dictionary of (low, high) band to a dictionary of percentile
+            to value, bands without patrons are left out
+        """
+        edges = np.asarray(bands)
+        band_index = np.digitize(self.ages, edges) - 1
+        in_range = (band_index >= 0) & (band_index < len(edges) - 1)
+        order = np.argsort(band_index[in_range], kind='stable')
+        sorted_bands = band_index[in_range][order]
+        sorted_counts = self.borrowed_counts[in_range][order]
+        present, starts = np.unique(sorted_bands, return_index=True)
+        groups = np.split(sorted_counts, starts[1:])
+        result = {}
+        for band, group in zip(present.tolist(), groups):
+            values = np.percentile(group, percentiles)
+            result[(bands[band], bands[band + 1])] = dict(zip(percentiles, values.tolist()))
+        return result
+
+    def titles_for_patron(self, position):
+        """Gets the borrowed titles of the patron at the given position.
+
+        :param position: the index of the patron in the columns
+        :returns: the list of titles
+        """
+        start, end = self.title_offsets[position], self.title_offsets[position + 1]
+        return [self.titles[code] for code in self.title_codes[start:end].tolist()]
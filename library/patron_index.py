@@ -0,0 +1,185 @@
+"""
+Filename: patron_index.py
+Description: sorted secondary indexes over the patron table
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+
+class SortedIndex:
+    """Sorted (key, doc_id) pairs answering range queries with binary search."""
+
+    def __init__(self):
+        """Constructor for the SortedIndex class."""
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, doc_id):
+        """Adds a document to the index.
+
+        :param key: the indexed value
+        :param doc_id: the TinyDB document ID
+        """
+        insort(self._entries, (key, doc_id))
+
+    def remove(self, key, doc_id):
+        """Removes a document from the index, if present.
+
+        :param key: the indexed value the document was added with
+        :param doc_id: the TinyDB document ID
+        """
+        position = bisect_left(self._entries, (key, doc_id))
+        if position < len(self._entries) and self._entries[position] == (key, doc_id):
+            del self._entries[position]
+
+    def range(self, low, high):
+        """Gets the documents with low <= key < high, in key order.
+
+        :param low: the smallest key included
+        :param high: the first key excluded
+        :returns: a list of document IDs
+        """
+        start = bisect_left(self._entries, (low,))
+        end = bisect_left(self._entries, (high,))
+        return [doc_id for _, doc_id in self._entries[start:end]]
+
+    def prefix(self, prefix):
+        """Gets the documents whose string key starts with prefix, in key order.
+
+        :param prefix: the start of the keys included
+        :returns: a list of document IDs
+        """
+        doc_ids = []
+        for key, doc_id in islice(self._entries, bisect_left(self._entries, (prefix,)), None):
+            if not key.startswith(prefix):
+                break
+            doc_ids.append(doc_id)
+        return doc_ids
+
+    def range_inclusive(self, low, high):
+        """Gets the documents with low <= key <= high, in key order.
+
+        :param low: the smallest key included
+        :param high: the largest key included
+        :returns: a list of document IDs
+        """
+        start = bisect_left(self._entries, (low,))
+        end = bisect_right(self._entries, (high, float('inf')))
+        return [doc_id for _, doc_id in self._entries[start:end]]
+
+
+def _age_key(doc):
+    age = doc.get('age')
+    if isinstance(age, (int, float)) and not isinstance(age, bool):
+        return age
+    return None
+
+
+def _lname_key(doc):
+    lname = doc.get('lname')
+    if isinstance(lname, str):
+        return lname.lower()
+    return None
+
+
+def _copy_doc(doc):
+    # borrowed_books is the live list of the Patron that was written, copy it too
+    doc = dict(doc)
+    if isinstance(doc.get('borrowed_books'), list):
+        doc['borrowed_books'] = list(doc['borrowed_books'])
+    return doc
+
+
+class PatronIndexes:
+    """Age and last name indexes, plus the indexed documents themselves.
+
+    Documents whose age is not a number or whose last name is not a string are
+    left out of the matching index. The indexes keep their own copy of every
+    document, roughly doubling the memory used by the patron table: TinyDB
+    re-reads and parses the whole file on every get(), so fetching the matches
+    by doc_id would cost a full table scan per query.
+    """
+
+    def __init__(self):
+        """Constructor for the PatronIndexes class, see build."""
+        self.age = SortedIndex()
+        self.lname = SortedIndex()
+        self._docs = {}
+        self._member_docs = {}
+
+    @classmethod
+    def build(cls, documents):
+        """Builds the indexes from TinyDB documents.
+
+        :param documents: the documents, each with a doc_id attribute
+        :returns: a PatronIndexes object
+        """
+        indexes = cls()
+        for doc in documents:
+            indexes.add(doc.doc_id, doc)
+        return indexes
+
+    def add(self, doc_id, doc):
+        """Indexes a newly inserted document.
+
+        :param doc_id: the TinyDB document ID
+        :param doc: the patron dictionary
+        """
+        doc = _copy_doc(doc)
+        self._docs[doc_id] = doc
+        self._member_docs.setdefault(doc.get('memberID'), set()).add(doc_id)
+        age = _age_key(doc)
+        if age is not None:
+            self.age.add(age, doc_id)
+        lname = _lname_key(doc)
+        if lname is not None:
+            self.lname.add(lname, doc_id)
+
+    def remove(self, doc_id):
+        """Removes a document from the indexes.
+
+        :param doc_id: the TinyDB document ID
+        """
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        member_docs = self._member_docs.get(doc.get('memberID'))
+        if member_docs is not None:
+            member_docs.discard(doc_id)
+            if not member_docs:
+                del self._member_docs[doc.get('memberID')]
+        age = _age_key(doc)
+        if age is not None:
+            self.age.remove(age, doc_id)
+        lname = _lname_key(doc)
+        if lname is not None:
+            self.lname.remove(lname, doc_id)
+
+    def update_member(self, memberID, fields):
+        """Applies an update to every document with the given memberID.
+
+        :param memberID: the ID of the updated Patron
+        :param fields: the fields written by the update
+        """
+        for doc_id in list(self._member_docs.get(memberID, ())):
+            doc = dict(self._docs[doc_id], **fields)
+            self.remove(doc_id)
+            self.add(doc_id, doc)
+
+    def by_age(self, min_age, max_age):
+        """Gets the patrons with min_age <= age <= max_age, youngest first.
+
+        :returns: a list of patron dictionaries
+        """
+        return [_copy_doc(self._docs[doc_id]) for doc_id in self.age.range_inclusive(min_age, max_age)]
+
+    def by_lname_prefix(self, prefix):
+        """Gets the patrons whose last name starts with prefix, ignoring case.
+
+        :returns: a list of patron dictionaries, ordered by last name
+        """
+        doc_ids = self.lname.prefix(prefix.lower())
+        return [_copy_doc(self._docs[doc_id]) for doc_id in doc_ids]
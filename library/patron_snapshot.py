@@ -0,0 +1,164 @@
+"""
+Filename: patron_snapshot.py
+Description: read-only, memory-mapped snapshots of the patron table for
+reporting processes
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from library.patron import Patron
+
+MAGIC = b'LPSN'
+VERSION = 1
+# magic, version, patron count, index offset, records offset, records end
+HEADER = struct.Struct('<4sB3xIQQQ')
+# key kind, key length, key offset, record offset, record length
+ENTRY = struct.Struct('<BIQQI')
+
+KEY_INT = 0
+KEY_STR = 1
+KEY_JSON = 2
+
+
+class InvalidSnapshotException(Exception):
+    """Custom Exception for a file that is not a patron snapshot."""
+    pass
+
+
+def _encode_key(memberID):
+    """Encodes a memberID into its index kind and sortable bytes."""
+    if type(memberID) is int and -2 ** 63 <= memberID < 2 ** 63:
+        return KEY_INT, struct.pack('>Q', memberID + 2 ** 63)
+    if type(memberID) is str:
+        return KEY_STR, memberID.encode('utf-8', 'surrogatepass')
+    return KEY_JSON, json.dumps(memberID, sort_keys=True).encode('utf-8')
+
+
+def export_snapshot(db, path):
+    """Writes a snapshot of every patron in the database.
+
+    The file is written next to path and renamed into place, so processes
+    still mapping an older snapshot are not disturbed.
+
+    :param db: the Library_DB to read patrons from
+    :param path: the snapshot file to write
+    :returns: the number of patrons written
+    """
+    patrons = db.get_all_patrons()
+    records = [json.dumps(patron, separators=(',', ':')).encode('utf-8') for patron in patrons]
+
+    keys = []
+    for position, patron in enumerate(patrons):
+        kind, key = _encode_key(patron.get('memberID'))
+        keys.append((kind, key, position))
+    # stable sort, so the first patron with a given memberID is found first
+    keys.sort(key=lambda entry: (entry[0], entry[1]))
+
+    index_offset = HEADER.size
+    keys_offset = index_offset + ENTRY.size * len(keys)
+    key_data = b''.join(key for _, key, _ in keys)
+    records_offset = keys_offset + len(key_data)
+
+    record_offsets = []
+    offset = records_offset + 1
+    for record in records:
+        record_offsets.append(offset)
+        offset += len(record) + 1
+    records_data = b'[' + b','.join(records) + b']'
+    records_end = records_offset + len(records_data)
+
+    entries = []
+    key_offset = keys_offset
+    for kind, key, position in keys:
+        entries.append(ENTRY.pack(kind, len(key), key_offset, record_offsets[position],
+            len(records[position])))
+        key_offset += len(key)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, VERSION, len(patrons), index_offset,
+            records_offset, records_end))
+        snapshot_file.write(b''.join(entries))
+        snapshot_file.write(key_data)
+        snapshot_file.write(records_data)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    return len(patrons)
+
+
+class PatronSnapshot:
+    """Read-only view of a patron snapshot, shared through the page cache.
+
+    Offers the read API of Library_DB; lookups by memberID binary search the
+    fixed-size index entries without parsing the other records.
+    """
+
+    def __init__(self, path):
+        """Constructor for the PatronSnapshot class, maps the file into memory.
+
+        :param path: the snapshot file written by export_snapshot
+        """
+        with open(path, 'rb') as snapshot_file:
+            # mmap refuses empty files, so check the size before mapping
+            if os.fstat(snapshot_file.fileno()).st_size < HEADER.size:
+                raise InvalidSnapshotException("Not a patron snapshot")
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._count, self._index_offset, self._records_offset,
+            self._records_end) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise InvalidSnapshotException("Not a patron snapshot")
+
+    def get_patron_count(self):
+        """Gets the number of Patrons in the snapshot.
+
+        :returns: the total number of Patrons
+        """
+        return self._count
+
+    def get_all_patrons(self):
+        """Gets a list of all the Patrons in the snapshot.
+
+        :returns: a list of all the Patrons, as dictionaries in database order
+        """
+        return json.loads(self._mmap[self._records_offset:self._records_end].decode('utf-8'))
+
+    def retrieve_patron(self, memberID):
+        """Gets a Patron from the snapshot.
+
+        :param memberID: the ID for the Patron to retrieve
+        :returns: the Patron with the given ID, or None
+        """
+        target = _encode_key(memberID)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._count or self._key_at(low) != target:
+            return None
+        _, _, _, record_offset, record_len = ENTRY.unpack_from(self._mmap,
+            self._index_offset + low * ENTRY.size)
+        data = json.loads(self._mmap[record_offset:record_offset + record_len].decode('utf-8'))
+        return Patron(data['fname'], data['lname'], data['age'], data['memberID'])
+
+    def close(self):
+        """Unmaps the snapshot."""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _key_at(self, position):
+        kind, key_len, key_offset, _, _ = ENTRY.unpack_from(self._mmap,
+            self._index_offset + position * ENTRY.size)
+        return kind, self._mmap[key_offset:key_offset + key_len]
@@ -0,0 +1,125 @@
+"""
+Filename: rate_limiter.py
+Description: token bucket rate limiter with priority lanes for Books_API
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+from library import metrics
+
+
+class RateLimiter:
+    """Token bucket shared by the callers of an upstream service.
+
+    Callers that find the bucket empty queue in their lane instead of failing.
+    Waiters are served first come first served within a lane, and the
+    interactive lane is always served before the batch lane.
+    """
+
+    INTERACTIVE = 'interactive'
+    BATCH = 'batch'
+    LANES = (INTERACTIVE, BATCH)
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Constructor for the RateLimiter class.
+
+        :param rate: the number of tokens added per second
+        :param capacity: the bucket size, i.e. the largest burst, defaults to rate
+        :param clock: the function returning the current time in seconds
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._condition = threading.Condition()
+        self._queues = {lane: collections.deque() for lane in self.LANES}
+        self._acquired = {lane: 0 for lane in self.LANES}
+        self._waited = {lane: 0.0 for lane in self.LANES}
+        self._max_depth = {lane: 0 for lane in self.LANES}
+
+    def acquire(self, lane=INTERACTIVE, timeout=None):
+        """Takes a token, waiting in the given lane until one is available.
+
+        :param lane: 'interactive' or 'batch'
+        :param timeout: optional maximum number of seconds to wait
+        :returns: True once a token was taken, False if the timeout expired
+        """
+        if lane not in self._queues:
+            raise ValueError("Unknown rate limiter lane %r" % lane)
+        start = self._clock()
+        deadline = start + timeout if timeout is not None else None
+        ticket = object()
+        with self._condition:
+            queue = self._queues[lane]
+            queue.append(ticket)
+            self._max_depth[lane] = max(self._max_depth[lane], len(queue))
+            metrics.registry.set_gauge('rate_limiter.queue_depth', len(queue), lane=lane)
+            try:
+                while True:
+                    self._refill()
+                    is_next = self._is_next(lane, ticket)
+                    if is_next and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    now = self._clock()
+                    if deadline is not None and now >= deadline:
+                        return False
+                    # only the head of the queue knows when its token arrives, the
+                    # others are woken when the head leaves
+                    wait_time = (1 - self._tokens) / self.rate if is_next else None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                    self._condition.wait(wait_time)
+            finally:
+                queue.remove(ticket)
+                metrics.registry.set_gauge('rate_limiter.queue_depth', len(queue), lane=lane)
+                self._condition.notify_all()
+            waited = self._clock() - start
+            self._acquired[lane] += 1
+            self._waited[lane] += waited
+        metrics.registry.observe('rate_limiter.wait', waited, lane=lane)
+        return True
+
+    async def acquire_async(self, lane=INTERACTIVE, poll_interval=0.01):
+        """Takes a token without blocking the event loop or an executor thread.
+
+        Polls the bucket between sleeps instead of queueing, so threads waiting
+        in acquire() are served first. Cancelling the awaiting task gives up
+        without taking a token.
+
+        :param lane: 'interactive' or 'batch'
+        :param poll_interval: the longest sleep between two attempts in seconds
+        """
+        delay = min(poll_interval, 1 / self.rate)
+        while not self.acquire(lane, timeout=0):
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """Gets the limiter's counters per lane.
+
+        :returns: a dictionary of lane to queue depth, max depth, acquired count
+            and total wait time in seconds
+        """
+        with self._condition:
+            return {lane: {'queue_depth': len(self._queues[lane]),
+                'max_queue_depth': self._max_depth[lane],
+                'acquired': self._acquired[lane],
+                'total_wait': self._waited[lane]} for lane in self.LANES}
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _is_next(self, lane, ticket):
+        for other in self.LANES:
+            if other == lane:
+                return self._queues[lane][0] is ticket
+            if self._queues[other]:
+                return False
+        return False
@@ -0,0 +1,135 @@
+"""
+Filename: resilience.py
+Description: retry policy and circuit breaker used by Books_API
+"""
+
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """Bounded retries with jittered exponential backoff."""
+
+    def __init__(self, max_retries=2, backoff_base=0.1, backoff_max=2.0, rng=None,
+            sleep=time.sleep):
+        """Constructor for the RetryPolicy class.
+
+        :param max_retries: the number of retries after the first attempt
+        :param backoff_base: the backoff ceiling in seconds for the first retry
+        :param backoff_max: the largest backoff ceiling in seconds
+        :param rng: optional random.Random used for the jitter
+        :param sleep: the function used to wait between attempts
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rng = rng or random.Random()
+        self._sleep = sleep
+
+    def delay(self, retry):
+        """Gets the "full jitter" backoff before the given retry.
+
+        :param retry: the retry number, starting at 0
+        :returns: a delay in seconds between 0 and the exponential ceiling
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** retry))
+        return self._rng.uniform(0, ceiling)
+
+    def wait(self, retry):
+        """Sleeps for the backoff before the given retry.
+
+        :param retry: the retry number, starting at 0
+        """
+        self._sleep(self.delay(retry))
+
+
+class CircuitBreaker:
+    """Stops calls to an unhealthy upstream until it has had time to recover.
+
+    The breaker opens after failure_threshold consecutive failures. Once
+    recovery_timeout has passed it is half open and lets a single trial call
+    through; a success closes it again and a failure re-opens it. A trial that
+    ends without either, e.g. a cancelled call, must be given up with
+    release_trial; one still running after recovery_timeout is assumed lost and
+    another trial is let through.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, clock=time.monotonic):
+        """Constructor for the CircuitBreaker class.
+
+        :param failure_threshold: the consecutive failures that open the breaker
+        :param recovery_timeout: the seconds to stay open before a trial call
+        :param clock: the function returning the current time in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._trial_started = None
+
+    @property
+    def state(self):
+        """The current state: 'closed', 'open' or 'half_open'."""
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def failure_count(self):
+        """The number of consecutive failures recorded."""
+        return self._failures
+
+    def allow_request(self):
+        """Determines if a call may go to the upstream.
+
+        :returns: True if the call may proceed, False to fail fast
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and (not self._trial_running
+                    or self._clock() - self._trial_started >= self.recovery_timeout):
+                self._state = self.HALF_OPEN
+                self._trial_running = True
+                self._trial_started = self._clock()
+                return True
+            return False
+
+    def release_trial(self):
+        """Gives up the trial call without recording an outcome.
+
+        Lets the next call be the trial, the breaker stays half open.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        """Records a successful call, closing the breaker."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Records a failed call, opening the breaker if the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self._state
@@ -0,0 +1,71 @@
+"""
+Filename: response_cache.py
+Description: in-memory cache of OpenLibrary responses keyed by request URL
+"""
+
+import collections
+import threading
+import time
+
+
+class ResponseCache:
+    """LRU cache of JSON responses with a freshness TTL.
+
+    Entries older than the TTL are not returned by get() but are kept, so they
+    can still be served by get_stale() while the upstream is unhealthy.
+    """
+
+    def __init__(self, ttl=300.0, max_entries=1024, clock=time.monotonic):
+        """Constructor for the ResponseCache class.
+
+        :param ttl: the number of seconds an entry is considered fresh
+        :param max_entries: the maximum number of entries kept
+        :param clock: the function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, url):
+        """Gets a fresh response for the URL.
+
+        :param url: the request URL
+        :returns: the cached JSON body, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or self._clock() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(url)
+            return entry[1]
+
+    def get_stale(self, url):
+        """Gets the last response for the URL regardless of its age.
+
+        :param url: the request URL
+        :returns: the cached JSON body, or None if missing
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry[1] if entry else None
+
+    def put(self, url, data):
+        """Stores a response, evicting the least recently used entry if full.
+
+        :param url: the request URL
+        :param data: the JSON body
+        """
+        with self._lock:
+            self._entries[url] = (self._clock(), data)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, url):
+        return self.get(url) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
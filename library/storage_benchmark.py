@@ -0,0 +1,112 @@
+"""
+Filename: storage_benchmark.py
+Description: compares opening and writing a generated patron table with the
+default JSONStorage and with BinaryStorage
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from tinydb.storages import JSONStorage
+
+from library.binary_storage import BinaryStorage
+from library.fake_openlibrary import WORDS
+
+FIRST_NAMES = ['ann', 'bob', 'cy', 'dee', 'eve', 'fay', 'gus', 'hal', 'ivy', 'jo']
+
+
+def generate_patrons(count, titles=5000, seed=0):
+    """Generates TinyDB data shaped like a Library_DB patron table.
+
+    :param count: the number of patrons
+    :param titles: the number of distinct borrowed titles
+    :param seed: the seed used so the same table is produced on every run
+    :returns: the TinyDB data, a dictionary of table name to documents
+    """
+    rng = random.Random(seed)
+    title_pool = ['%s %s %d' % (rng.choice(WORDS), rng.choice(WORDS), i) for i in range(titles)]
+    docs = {}
+    for doc_id in range(1, count + 1):
+        docs[str(doc_id)] = {
+            'fname': rng.choice(FIRST_NAMES),
+            'lname': 'lname%d' % rng.randint(1, count),
+            'age': rng.randint(5, 90),
+            'memberID': doc_id,
+            'borrowed_books': rng.sample(title_pool, rng.randint(0, 4)),
+        }
+    return {'_default': docs}
+
+
+def _best_of(repeat, func):
+    """Gets the fastest of repeat timed calls of func, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _time_storage(storage_class, path, data, repeat):
+    def write():
+        storage = storage_class(path)
+        storage.write(data)
+        storage.close()
+
+    def open_table():
+        storage = storage_class(path)
+        storage.read()
+        storage.close()
+
+    write_time = _best_of(repeat, write)
+    open_time = _best_of(repeat, open_table)
+    return {'write': write_time, 'open': open_time, 'size': os.path.getsize(path)}
+
+
+def run(count, repeat=3, directory=None, seed=0):
+    """Times both storages on the same generated table.
+
+    :param count: the number of patrons
+    :param repeat: the number of runs, the fastest one is kept
+    :param directory: where the files are written, a temporary one by default
+    :param seed: the seed for the generated table
+    :returns: a dictionary of 'json' and 'binary' to their 'write' and 'open'
+        times in seconds and file 'size' in bytes
+    """
+    data = generate_patrons(count, seed=seed)
+    tmp_dir = directory or tempfile.mkdtemp()
+    try:
+        return {
+            'json': _time_storage(JSONStorage, os.path.join(tmp_dir, 'db.json'), data, repeat),
+            'binary': _time_storage(BinaryStorage, os.path.join(tmp_dir, 'db.bin'), data,
+                repeat),
+        }
+    finally:
+        if directory is None:
+            shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    """Prints the comparison for a table of the given size."""
+    parser = argparse.ArgumentParser(description='Compare JSONStorage and BinaryStorage')
+    parser.add_argument('--patrons', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = run(args.patrons, args.repeat, seed=args.seed)
+    print("%-8s %10s %10s %12s" % ('storage', 'open (s)', 'write (s)', 'size (MB)'))
+    for name in ('json', 'binary'):
+        result = results[name]
+        print("%-8s %10.3f %10.3f %12.1f" % (name, result['open'], result['write'],
+            result['size'] / 1e6))
+    print("open speedup: %.1fx" % (results['json']['open'] / results['binary']['open']))
+
+
+if __name__ == '__main__':
+    main()
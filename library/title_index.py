@@ -0,0 +1,168 @@
+"""
+Filename: title_index.py
+Description: prefix and typo-tolerant search over borrowed book titles
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+
+
+def _grams(text, size):
+    """Gets the n-grams of a string, padded at the start so prefixes match."""
+    padded = ' ' * (size - 1) + text
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def prefix_distance(query, title, max_distance):
+    """Gets the edit distance between query and the closest prefix of title.
+
+    :param query: the typed text
+    :param title: the candidate title
+    :param max_distance: the distance above which the search gives up
+    :returns: the distance, or None if it is larger than max_distance
+    """
+    # prefixes longer than this are already more than max_distance edits away
+    title = title[:len(query) + max_distance]
+    previous = list(range(len(title) + 1))
+    for i, query_char in enumerate(query, 1):
+        current = [i]
+        for j, title_char in enumerate(title, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                previous[j - 1] + (query_char != title_char)))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    distance = min(previous)
+    return distance if distance <= max_distance else None
+
+
+class TitleIndex:
+    """Incremental index of the titles currently borrowed by patrons.
+
+    Keeps the distinct titles in a sorted list for prefix completion and an
+    n-gram index for typo-tolerant matching. Each title counts the patrons
+    holding it and leaves the index when the last copy is returned.
+    """
+
+    def __init__(self, gram_size=3, max_candidates=64, max_posting=1000):
+        """Constructor for the TitleIndex class.
+
+        :param gram_size: the length of the n-grams
+        :param max_candidates: the number of titles scored by edit distance per query
+        :param max_posting: n-grams shared by more titles than this are skipped
+            during fuzzy matching; if all of them are, only this many titles of
+            the rarest one are considered
+        """
+        self.gram_size = gram_size
+        self.max_candidates = max_candidates
+        self.max_posting = max_posting
+        self._titles = []
+        self._holders = {}
+        self._postings = {}
+
+    @classmethod
+    def build(cls, patrons, **kwargs):
+        """Builds the index from patron dictionaries.
+
+        :param patrons: the patrons, as returned by Library_DB.get_all_patrons
+        :returns: a TitleIndex object
+        """
+        index = cls(**kwargs)
+        for patron in patrons:
+            for title in patron.get('borrowed_books', []):
+                index.add(title)
+        return index
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __contains__(self, title):
+        return title.lower() in self._holders
+
+    def holders(self, title):
+        """Gets the number of patrons holding a title.
+
+        :param title: the title of the book
+        :returns: the number of holders, 0 if not borrowed
+        """
+        return self._holders.get(title.lower(), 0)
+
+    def add(self, title):
+        """Records that one more patron holds the title.
+
+        :param title: the title of the book
+        """
+        title = title.lower()
+        if title in self._holders:
+            self._holders[title] += 1
+            return
+        self._holders[title] = 1
+        insort(self._titles, title)
+        for gram in _grams(title, self.gram_size):
+            self._postings.setdefault(gram, set()).add(title)
+
+    def remove(self, title):
+        """Records that one patron returned the title.
+
+        :param title: the title of the book
+        """
+        title = title.lower()
+        if title not in self._holders:
+            return
+        self._holders[title] -= 1
+        if self._holders[title] > 0:
+            return
+        del self._holders[title]
+        del self._titles[bisect_left(self._titles, title)]
+        for gram in _grams(title, self.gram_size):
+            posting = self._postings[gram]
+            posting.discard(title)
+            if not posting:
+                del self._postings[gram]
+
+    def complete(self, prefix, limit=10):
+        """Gets the titles starting with prefix, in alphabetical order.
+
+        :param prefix: the typed text
+        :param limit: the maximum number of titles returned
+        :returns: a list of titles
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self._titles, prefix)
+        results = []
+        for title in self._titles[start:start + limit]:
+            if not title.startswith(prefix):
+                break
+            results.append(title)
+        return results
+
+    def match(self, text, limit=10, max_distance=2):
+        """Gets the titles that start with something close to text.
+
+        :param text: the typed text, possibly misspelled
+        :param limit: the maximum number of titles returned
+        :param max_distance: the maximum number of edits allowed
+        :returns: a list of titles, closest first, then most held
+        """
+        text = text.lower()
+        if not text:
+            return self.complete(text, limit)
+        postings = sorted((self._postings[gram] for gram in _grams(text, self.gram_size)
+            if gram in self._postings), key=len)
+        selective = [posting for posting in postings if len(posting) <= self.max_posting]
+        overlap = Counter()
+        if selective:
+            for posting in selective:
+                overlap.update(posting)
+        elif postings:
+            overlap.update(islice(postings[0], self.max_posting))
+        for title in self.complete(text, self.max_candidates):
+            overlap[title] += len(text)
+        scored = []
+        for title, _ in overlap.most_common(self.max_candidates):
+            distance = prefix_distance(text, title, max_distance)
+            if distance is not None:
+                scored.append((distance, -self._holders[title], title))
+        scored.sort()
+        return [title for _, _, title in scored[:limit]]
@@ -0,0 +1,296 @@
+"""
+Filename: tracing.py
+Description: nested tracing spans and an opt-in sampling profiler hook
+"""
+
+import collections
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+
+class Span:
+    """A timed, named phase of work that can contain nested spans."""
+
+    def __init__(self, name, attributes=None):
+        """Constructor for the Span class.
+
+        :param name: the name of the span, e.g. 'books_api.http'
+        :param attributes: optional dictionary of extra data
+        """
+        self.name = name
+        self.attributes = attributes or {}
+        self.children = []
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        """The duration of the span in seconds, None while it is still open."""
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def to_dict(self):
+        """Converts the span and its children to a dictionary format.
+
+        :returns: a dictionary of the span's data
+        """
+        return {'name': self.name, 'duration': self.duration, 'attributes': self.attributes,
+            'children': [child.to_dict() for child in self.children]}
+
+
+class _NoopSpan:
+    """Context manager returned by a disabled tracer."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    """Context manager opening a span on the current span stack."""
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.span = Span(name, attributes)
+
+    def __enter__(self):
+        stack = self.tracer._stack.get()
+        if stack:
+            stack[-1].children.append(self.span)
+        self._root = not stack
+        self._token = self.tracer._stack.set(stack + (self.span,))
+        self.span.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.attributes['error'] = exc_type.__name__
+        self.tracer._stack.reset(self._token)
+        if self._root:
+            self.tracer._finish(self.span)
+        return False
+
+
+class _AttachContext:
+    """Context manager pushing an existing span on the current span stack."""
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        self._token = self.tracer._stack.set(self.tracer._stack.get() + (self.span,))
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer._stack.reset(self._token)
+        return False
+
+
+class Tracer:
+    """Collects trees of spans per thread or asyncio task, keeping the most
+    recent root spans.
+
+    The tracer starts disabled, in which case span() returns a shared no-op
+    context manager.
+    """
+
+    def __init__(self, max_traces=1000):
+        """Constructor for the Tracer class.
+
+        :param max_traces: the number of finished root spans to keep
+        """
+        self.enabled = False
+        # a tuple of the open spans, innermost last; a context variable rather
+        # than a thread local so concurrent tasks on one loop do not interleave
+        self._stack = contextvars.ContextVar('tracing_stack_%d' % id(self), default=())
+        self._lock = threading.Lock()
+        self._traces = collections.deque(maxlen=max_traces)
+
+    def enable(self):
+        """Starts recording spans."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops recording spans, already finished traces are kept."""
+        self.enabled = False
+
+    def reset(self):
+        """Discards all finished traces."""
+        with self._lock:
+            self._traces.clear()
+
+    def span(self, name, **attributes):
+        """Opens a span, nested under the current span of this thread or task if any.
+
+        :param name: the name of the span
+        :param attributes: extra data stored on the span
+        :returns: a context manager yielding the Span, or None when disabled
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+    def current_span(self):
+        """Gets the innermost open span of this thread or task.
+
+        :returns: the Span, or None outside of any span
+        """
+        stack = self._stack.get()
+        return stack[-1] if stack else None
+
+    def attach(self, span):
+        """Makes spans opened on this thread nest under a span from another thread.
+
+        :param span: the parent Span, e.g. from current_span() on the calling thread
+        :returns: a context manager; the parent is not finished on exit
+        """
+        return _AttachContext(self, span)
+
+    def get_traces(self):
+        """Gets the finished root spans, oldest first.
+
+        :returns: a list of span dictionaries
+        """
+        with self._lock:
+            traces = list(self._traces)
+        return [trace.to_dict() for trace in traces]
+
+    def dump(self, path):
+        """Writes the finished traces to a file, one JSON document per line.
+
+        :param path: the file to write
+        """
+        with open(path, 'w') as trace_file:
+            for trace in self.get_traces():
+                trace_file.write(json.dumps(trace) + '\n')
+
+    def _finish(self, span):
+        with self._lock:
+            self._traces.append(span)
+
+
+# held while a cProfile.Profile is running, process-wide because the profiler
+# hooks are; Python 3.12+ refuses to start a second one
+_profile_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """Runs cProfile on a random fraction of traced calls and dumps the results."""
+
+    def __init__(self):
+        """Constructor for the SamplingProfiler class, profiling starts disabled."""
+        self.sample_rate = 0.0
+        self.output_dir = None
+        self._rng = random.Random()
+        self._counter = itertools.count()
+
+    def configure(self, sample_rate, output_dir, seed=None):
+        """Turns on profiling for a fraction of calls.
+
+        :param sample_rate: the fraction of calls to profile, between 0 and 1
+        :param output_dir: the directory the .prof files are written to
+        :param seed: optional seed for the sampling decisions
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self._rng = random.Random(seed)
+        self.sample_rate = sample_rate
+
+    def disable(self):
+        """Turns off profiling."""
+        self.sample_rate = 0.0
+
+    def call(self, name, func, *args, **kwargs):
+        """Calls func, profiling it if this call is sampled.
+
+        Only one cProfile can be active in the process, so calls made while
+        another profile is running, on any thread, are not profiled. Each
+        profile is written with pstats-compatible dump_stats to
+        '<output_dir>/<name>-<pid>-<n>.prof'.
+
+        :param name: the name used for the profile file
+        :param func: the function to call
+        :returns: the result of func
+        """
+        if self.sample_rate <= 0 or self._rng.random() >= self.sample_rate:
+            return func(*args, **kwargs)
+        if not _profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            _profile_lock.release()
+            filename = '%s-%d-%d.prof' % (name, os.getpid(), next(self._counter))
+            profile.dump_stats(os.path.join(self.output_dir, filename))
+
+
+tracer = Tracer()
+profiler = SamplingProfiler()
+
+
+def span(name, **attributes):
+    """Opens a span on the module tracer, see Tracer.span."""
+    return tracer.span(name, **attributes)
+
+
+def propagate(func):
+    """Wraps func so spans it opens on another thread nest under the current span.
+
+    :param func: the function handed to a thread or executor
+    :returns: the wrapped function, or func itself outside of any span
+    """
+    parent = tracer.current_span() if tracer.enabled else None
+    if parent is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracer.attach(parent):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def traced(name):
+    """Decorator wrapping a function in a span and the sampling profiler hook.
+
+    Coroutine functions get the span only, cProfile cannot follow a coroutine
+    across the other tasks of the event loop.
+
+    :param name: the span name, e.g. 'library.get_languages_for_book'
+    :returns: the decorator
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled and profiler.sample_rate <= 0:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return profiler.call(name, func, *args, **kwargs)
+        return wrapper
+    return decorator
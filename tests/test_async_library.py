@@ -0,0 +1,142 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from library import metrics, tracing
+from library.fake_openlibrary import FakeOpenLibraryServer, fixed_latency
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+from library.resilience import CircuitBreaker, RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+"""
+Filename: test_async_library.py
+Description: Unit tests for the AsyncLibrary facade.
+"""
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncLibrary(unittest.TestCase):
+    def setUp(self):
+        from library.async_ext_api_interface import AsyncBooks_API
+        from library.async_library import AsyncLibrary
+        docs = [
+            {"title": "The Hobbit", "title_suggest": "The Hobbit", "author_name": ["J.R.R. Tolkien"],
+                "language": ["eng", "ger"], "ebook_count_i": 2},
+            {"title": "The Hobbit Companion", "title_suggest": "The Hobbit Companion",
+                "author_name": ["David Day"], "language": ["fre"], "ebook_count_i": 1}
+        ]
+        self.server = FakeOpenLibraryServer(docs=docs).start()
+        self.addCleanup(self.server.stop)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        library = Library()
+        library.db = Library_DB(os.path.join(self.tmp_dir, "db.json"))
+        self.addCleanup(library.db.close_db)
+        api = AsyncBooks_API(api_url=self.server.url, retry=RetryPolicy(max_retries=0))
+        self.CuT = AsyncLibrary(library=library, api=api)
+
+    def run_async(self, coroutine):
+        async def run_and_close():
+            try:
+                return await coroutine
+            finally:
+                await self.CuT.close()
+        return asyncio.run(run_and_close())
+
+    def test_api_methods(self):
+        async def scenario():
+            return await asyncio.gather(
+                self.CuT.is_ebook("the hobbit"),
+                self.CuT.get_ebooks_count("hobbit"),
+                self.CuT.is_book_by_author("tolkien", "THE HOBBIT"),
+                self.CuT.get_languages_for_book("hobbit"))
+
+        self.assertEqual(self.run_async(scenario()), [True, 3, True, {"eng", "ger", "fre"}])
+
+    def test_api_methods_instrumented(self):
+        metrics.registry.reset()
+        metrics.registry.enable()
+        self.addCleanup(metrics.registry.reset)
+        self.addCleanup(metrics.registry.disable)
+        tracing.tracer.reset()
+        tracing.tracer.enable()
+        self.addCleanup(tracing.tracer.reset)
+        self.addCleanup(tracing.tracer.disable)
+
+        async def scenario():
+            return await asyncio.gather(
+                self.CuT.get_languages_for_book("hobbit"),
+                self.CuT.get_languages_for_book("companion"))
+
+        self.run_async(scenario())
+        counters = {entry['name']: entry['value'] for entry in metrics.registry.snapshot()['counters']}
+        self.assertEqual(counters['async_library.get_languages_for_book.calls'], 2)
+        # the two concurrent calls make two separate traces
+        traces = tracing.tracer.get_traces()
+        self.assertEqual([trace['name'] for trace in traces],
+            ["async_library.get_languages_for_book"] * 2)
+        for trace in traces:
+            self.assertEqual([child['name'] for child in trace['children']],
+                ["books_api.parse_docs"])
+
+    def test_db_methods_serialized_off_loop(self):
+        threads = set()
+        original = self.CuT.library.register_patron
+
+        def register(*args):
+            threads.add(threading.current_thread().name)
+            return original(*args)
+
+        self.CuT.library.register_patron = register
+
+        async def scenario():
+            loop_thread = threading.current_thread().name
+            await asyncio.gather(*(self.CuT.register_patron("p", "q", 20, i) for i in range(5)))
+            patron = Patron("ann", "lee", 30, 99)
+            await self.CuT.register_patron("ann", "lee", 30, 99)
+            await self.CuT.borrow_book("Dune", patron)
+            return (loop_thread, await self.CuT.is_patron_registered(patron),
+                await self.CuT.is_book_borrowed("dune", patron),
+                await self.CuT.complete_title("du"))
+
+        loop_thread, registered, borrowed, titles = self.run_async(scenario())
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(loop_thread, threads)
+        self.assertTrue(registered)
+        self.assertTrue(borrowed)
+        self.assertEqual(titles, ["dune"])
+        self.assertEqual(self.CuT.library.db.get_patron_count(), 6)
+
+    def test_server_error_returns_empty(self):
+        self.server.error_rate = 1.0
+        self.assertEqual(self.run_async(self.CuT.get_ebooks_count("hobbit")), 0)
+
+
+    def test_cancelled_trial_released(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10
+        self.CuT.api.breaker = breaker
+        self.server.latency = fixed_latency(0.5)
+        url = self.server.url + "?q=hobbit"
+
+        async def scenario():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(self.CuT.api.make_request(url), 0.05)
+            self.server.latency = None
+            return await self.CuT.api.make_request(url)
+
+        self.assertEqual(len(self.run_async(scenario())['docs']), 2)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
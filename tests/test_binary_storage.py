@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from library.binary_storage import (BinaryStorage, InvalidBinaryFileException, encode, decode,
+    convert_json_to_binary, convert_binary_to_json)
+from library.library_db_interface import Library_DB
+from library.storage_benchmark import generate_patrons, run
+from library.patron import Patron
+
+"""
+Filename: test_binary_storage.py
+Description: Unit tests for the binary patron storage format.
+"""
+
+class TestBinaryStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.data = {"_default": {
+            "1": {"fname": "ann", "lname": "lee", "age": 30, "memberID": "a1",
+                "borrowed_books": ["the hobbit", "dune"]},
+            "2": {"fname": "bob", "lname": "lee", "age": 12, "memberID": 2,
+                "borrowed_books": ["dune"]},
+            "3": {"note": "not a patron"},
+            "4": {"fname": "cy", "lname": "x", "age": "old", "memberID": 3, "borrowed_books": []}
+        }}
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def test_round_trip(self):
+        self.assertEqual(decode(encode(self.data)), self.data)
+        self.assertEqual(list(decode(encode(self.data))["_default"]), ["1", "2", "3", "4"])
+
+    def test_titles_stored_once(self):
+        encoded = encode(self.data)
+        self.assertEqual(encoded.count(b"dune"), 1)
+        self.assertLess(len(encoded), len(json.dumps(self.data)))
+
+    def test_round_trip_string_with_separator(self):
+        self.data["_default"]["2"]["borrowed_books"] = ["a\x00b", ""]
+        self.assertEqual(decode(encode(self.data)), self.data)
+
+    def test_round_trip_generated_table(self):
+        data = generate_patrons(500)
+        data["empty"] = {}
+        self.assertEqual(decode(encode(data)), data)
+
+    def test_invalid_file(self):
+        with self.assertRaises(InvalidBinaryFileException):
+            decode(b"nope")
+
+    def test_converters_lossless(self):
+        json_path = self.path("db.json")
+        with open(json_path, "w") as db_file:
+            json.dump(self.data, db_file)
+        convert_json_to_binary(json_path, self.path("db.bin"))
+        convert_binary_to_json(self.path("db.bin"), self.path("back.json"))
+        with open(self.path("back.json")) as db_file:
+            self.assertEqual(json.load(db_file), self.data)
+
+    def test_library_db_with_binary_storage(self):
+        db = Library_DB(self.path("db.bin"), storage=BinaryStorage)
+        patron = Patron("ann", "lee", 30, "a1")
+        patron.add_borrowed_book("Dune")
+        db.insert_patron(patron)
+        db.close_db()
+
+        db = Library_DB(self.path("db.bin"), storage=BinaryStorage)
+        self.addCleanup(db.close_db)
+        self.assertEqual(db.get_all_patrons(), [{"fname": "ann", "lname": "lee", "age": 30,
+            "memberID": "a1", "borrowed_books": ["dune"]}])
+        self.assertIsNotNone(db.retrieve_patron("a1"))
+
+
+    def test_benchmark_runs(self):
+        results = run(200, repeat=1, directory=self.tmp_dir)
+        self.assertLess(results['binary']['size'], results['json']['size'])
+        self.assertGreater(results['binary']['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
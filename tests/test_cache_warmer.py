@@ -0,0 +1,92 @@
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from library.cache_warmer import CacheWarmer, rank_borrowed_titles
+from library.ext_api_interface import Books_API
+from library.fake_openlibrary import FakeOpenLibraryServer
+from library.library import Library
+from library.rate_limiter import RateLimiter
+from library.response_cache import ResponseCache
+
+"""
+Filename: test_cache_warmer.py
+Description: Unit tests for the background cache warmer.
+"""
+
+class TestCacheWarmer(unittest.TestCase):
+    def setUp(self):
+        self.patrons = [
+            {"borrowed_books": ["hobbit", "dune"]},
+            {"borrowed_books": ["dune"]},
+            {"borrowed_books": ["emma", "dune", "hobbit"]}
+        ]
+        self.db = MagicMock()
+        self.db.get_all_patrons.return_value = self.patrons
+        self.server = FakeOpenLibraryServer(docs=[
+            {"title": "Dune", "title_suggest": "Dune", "ebook_count_i": 1, "language": ["eng"]},
+            {"title": "The Hobbit", "title_suggest": "The Hobbit", "ebook_count_i": 0}
+        ]).start()
+        self.addCleanup(self.server.stop)
+
+    def test_rank_borrowed_titles(self):
+        self.assertEqual(rank_borrowed_titles(self.patrons), ["dune", "hobbit", "emma"])
+
+    def test_requires_cache(self):
+        with self.assertRaises(ValueError):
+            CacheWarmer(Books_API(), ["dune"])
+
+    def test_prefetch_within_budget(self):
+        api = Books_API(api_url=self.server.url, cache=ResponseCache())
+        warmer = CacheWarmer.from_db(self.db, api, max_titles=2)
+        warmer.start()
+        warmer.join(5)
+        self.assertEqual(warmer.warmed, ["dune", "hobbit"])
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(warmer.api.priority, "batch")
+
+        # served from the warmed cache without another request
+        self.assertEqual(api.get_ebooks("dune"), [{"title": "Dune", "ebook_count": 1}])
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_cancel(self):
+        api = Books_API(api_url=self.server.url, cache=ResponseCache())
+        warmer = CacheWarmer(api, ["dune", "hobbit", "emma"], delay=10)
+        warmer.start()
+        while not warmer.warmed:
+            time.sleep(0.001)
+        warmer.cancel(timeout=5)
+        self.assertFalse(warmer.is_alive())
+        self.assertTrue(warmer.cancelled)
+        self.assertEqual(warmer.warmed, ["dune"])
+
+    def test_cancel_while_waiting_for_token(self):
+        limiter = RateLimiter(rate=0.01, capacity=1)
+        limiter.acquire()
+        with patch.object(Books_API, "rate_limiter", limiter):
+            warmer = CacheWarmer(Books_API(api_url=self.server.url, cache=ResponseCache()),
+                ["dune"])
+        warmer.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        warmer.cancel(timeout=5)
+        self.assertFalse(warmer.is_alive())
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(warmer.warmed, [])
+        self.assertEqual(self.server.request_count, 0)
+
+    def test_library_start_cache_warmer(self):
+        with patch("library.library.Library_DB"):
+            library = Library()
+            library.api = Books_API(api_url=self.server.url)
+            library.db.get_all_patrons.return_value = self.patrons
+            warmer = library.start_cache_warmer(max_titles=1)
+            warmer.join(5)
+        self.assertIsNotNone(library.api.cache)
+        # the warmed "dune" entry also serves queries in another case
+        self.assertTrue(library.is_ebook("Dune"))
+        self.assertEqual(library.get_languages_for_book("DUNE"), {"eng"})
+        self.assertEqual(self.server.request_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
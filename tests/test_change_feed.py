@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+from library import metrics
+from library.change_feed import ChangeFeed
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+
+"""
+Filename: test_change_feed.py
+Description: Unit tests for the patron change feed.
+"""
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.journal_path = os.path.join(self.tmp_dir, "changes.jsonl")
+
+    def test_in_memory_read_from(self):
+        feed = ChangeFeed(max_events=3)
+        for i in range(5):
+            feed.publish("update_patron", {"memberID": i})
+        self.assertEqual([event['seq'] for event in feed.read_from(3)], [4, 5])
+        self.assertEqual([event['seq'] for event in feed.read_from(2, limit=1)], [3])
+        with self.assertRaises(LookupError):
+            feed.read_from(0)
+
+    def test_subscribers(self):
+        feed = ChangeFeed()
+        received = []
+        feed.subscribe(received.append)
+        feed.subscribe(lambda event: 1 / 0)
+        feed.publish("insert_patron", {"memberID": 1}, doc_id=1)
+        feed.unsubscribe(received.append)
+        feed.publish("update_patron", {"memberID": 1})
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]['doc_id'], 1)
+
+    def test_subscribers_can_use_the_feed(self):
+        feed = ChangeFeed()
+        received = []
+
+        def follow(event):
+            received.append((event['seq'], len(feed.read_from(0))))
+            if event['kind'] == "insert_patron":
+                feed.publish("update_patron", {"memberID": 1})
+            else:
+                feed.unsubscribe(follow)
+
+        feed.subscribe(follow)
+        feed.publish("insert_patron", {"memberID": 1})
+        feed.publish("update_patron", {"memberID": 1})
+        self.assertEqual(received, [(1, 1), (2, 2)])
+        self.assertEqual(feed.last_sequence, 3)
+
+    def test_journal_resumes(self):
+        feed = ChangeFeed(self.journal_path)
+        feed.publish("insert_patron", {"memberID": 1})
+        feed.publish("borrow_book", {"memberID": 1}, book="dune")
+        feed.close()
+        with open(self.journal_path, "ab") as journal:
+            journal.write(b'{"seq": 3, "kind"')
+
+        feed = ChangeFeed(self.journal_path)
+        self.addCleanup(feed.close)
+        self.assertEqual(feed.last_sequence, 2)
+        feed.publish("return_borrowed_book", {"memberID": 1}, book="dune")
+        events = feed.read_from(1)
+        self.assertEqual([(event['seq'], event['kind']) for event in events],
+            [(2, "borrow_book"), (3, "return_borrowed_book")])
+        self.assertEqual(feed.read_from(3), [])
+
+    def test_failed_journal_write_is_dropped(self):
+        metrics.registry.reset()
+        metrics.registry.enable()
+        self.addCleanup(metrics.registry.reset)
+        self.addCleanup(metrics.registry.disable)
+        feed = ChangeFeed(self.journal_path)
+        self.addCleanup(feed.close)
+        feed.publish("insert_patron", {"memberID": 1})
+        journal = feed._journal
+
+        def partial_write(data):
+            journal.write(data[:10])
+            journal.flush()
+            raise OSError("No space left on device")
+
+        feed._journal = Mock(wraps=journal)
+        feed._journal.write.side_effect = partial_write
+        self.assertIsNone(feed.publish("borrow_book", {"memberID": 1}, book="dune"))
+        self.assertEqual(feed.last_sequence, 1)
+        self.assertEqual(feed.publish("borrow_book", {"memberID": 1}, book="emma")['seq'], 2)
+        self.assertEqual([event['book'] for event in feed.read_from(1)], ["emma"])
+        counters = {entry['name']: entry['value'] for entry in metrics.registry.snapshot()['counters']}
+        self.assertEqual(counters['change_feed.journal_errors'], 1)
+
+        feed.close()
+        feed = ChangeFeed(self.journal_path)
+        self.addCleanup(feed.close)
+        self.assertEqual([event['seq'] for event in feed.read_from(0)], [1, 2])
+
+    def test_library_mutations_emit_one_event_each(self):
+        feed = ChangeFeed()
+        library = Library()
+        library.db = Library_DB(os.path.join(self.tmp_dir, "db.json"), feed=feed)
+        self.addCleanup(library.db.close_db)
+        patron = Patron("ann", "lee", 30, 1)
+        library.register_patron("ann", "lee", 30, 1)
+        library.borrow_book("Dune", patron)
+        library.return_borrowed_book("Dune", patron)
+        patron.age = 31
+        library.db.update_patron(patron)
+        library.db.update_patron(Patron("nobody", "here", 1, 2))
+
+        events = feed.read_from(0)
+        self.assertEqual([event['kind'] for event in events],
+            ["insert_patron", "borrow_book", "return_borrowed_book", "update_patron"])
+        self.assertEqual([event['seq'] for event in events], [1, 2, 3, 4])
+        self.assertEqual(events[1]['book'], "dune")
+        self.assertEqual(events[1]['patron']['borrowed_books'], ["dune"])
+        self.assertEqual(events[3]['patron']['age'], 31)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from library.ext_api_interface import Books_API
+from library.fake_openlibrary import FakeOpenLibraryServer, generate_docs, fixed_latency
+
+"""
+Filename: test_fake_openlibrary.py
+Description: Unit tests for the fake OpenLibrary server.
+"""
+
+class TestFakeOpenLibrary(unittest.TestCase):
+    def setUp(self):
+        self.docs = [
+            {"title": "The Hobbit", "title_suggest": "The Hobbit", "author_name": ["J.R.R. Tolkien"],
+                "language": ["eng", "ger"], "ebook_count_i": 2},
+            {"title": "Frankenstein", "title_suggest": "Frankenstein", "author_name": ["Mary Shelley"],
+                "ebook_count_i": 0}
+        ]
+
+    def test_generate_docs_reproducible(self):
+        self.assertEqual(generate_docs(20, seed=3), generate_docs(20, seed=3))
+        self.assertEqual(len(generate_docs(20)), 20)
+
+    def test_books_api_against_server(self):
+        with FakeOpenLibraryServer(docs=self.docs) as server:
+            api = Books_API(api_url=server.url)
+            self.assertTrue(api.is_book_available("hobbit"))
+            self.assertFalse(api.is_book_available("dune"))
+            self.assertEqual(api.books_by_author("shelley"), ["Frankenstein"])
+            self.assertEqual(api.get_ebooks("hobbit"), [{"title": "The Hobbit", "ebook_count": 2}])
+            self.assertEqual(server.request_count, 4)
+
+    def test_injected_errors(self):
+        with FakeOpenLibraryServer(docs=self.docs, error_rate=1.0) as server:
+            api = Books_API(api_url=server.url)
+            self.assertIsNone(api.make_request(server.url + "?q=hobbit"))
+            self.assertGreaterEqual(server.error_count, 1)
+
+    def test_latency_and_chunked_body(self):
+        with FakeOpenLibraryServer(docs=self.docs, latency=fixed_latency(0.01),
+                chunk_size=16, chunk_delay=0.001) as server:
+            api = Books_API(api_url=server.url)
+            info = api.get_book_info("hobbit")
+            self.assertEqual(info, [{"title": "The Hobbit", "language": ["eng", "ger"]}])
+
+    def test_default_api_url(self):
+        self.assertEqual(Books_API().API_URL, Books_API.API_URL)
+
+
+if __name__ == '__main__':
+    unittest.main()
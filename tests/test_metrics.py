@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+from library import metrics
+from library.metrics import MetricsRegistry, Histogram
+from library.ext_api_interface import Books_API
+from library.resilience import RetryPolicy
+from library.library_db_interface import Library_DB
+from library.library import Library
+
+"""
+Filename: test_metrics.py
+Description: Unit tests for the metrics registry and instrumentation.
+"""
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        metrics.registry.enable()
+        self.addCleanup(metrics.registry.disable)
+        self.addCleanup(metrics.registry.reset)
+
+    def find(self, kind, name, **labels):
+        for entry in metrics.registry.snapshot()[kind]:
+            if entry['name'] == name and entry['labels'] == labels:
+                return entry
+        return None
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry()
+        registry.increment("calls")
+        registry.observe("latency", 0.1)
+        self.assertEqual(registry.snapshot(), {'counters': [], 'gauges': [], 'histograms': []})
+
+    def test_histogram_buckets(self):
+        histogram = Histogram(buckets=(1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+        data = histogram.to_dict()
+        self.assertEqual([bucket['count'] for bucket in data['buckets']], [1, 1, 1])
+        self.assertEqual(data['min'], 0.5)
+        self.assertEqual(data['max'], 50)
+
+    def test_instrument_counts_errors(self):
+        @metrics.instrument("op")
+        def failing():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            failing()
+        self.assertEqual(self.find('counters', 'op.calls')['value'], 1)
+        self.assertEqual(self.find('counters', 'op.errors')['value'], 1)
+        self.assertEqual(self.find('histograms', 'op.latency')['count'], 1)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_make_request_by_endpoint_and_status(self, mock_get):
+        mock_get.return_value.status_code = 500
+        Books_API(retry=RetryPolicy(max_retries=0)).make_request(
+            "http://openlibrary.org/search.json?q=book")
+        counter = self.find('counters', 'books_api.requests', endpoint='/search.json', status='500')
+        self.assertEqual(counter['value'], 1)
+        self.assertIsNotNone(self.find('histograms', 'books_api.latency',
+            endpoint='/search.json', status='500'))
+
+    @patch('library.library_db_interface.TinyDB')
+    def test_library_db_operations(self, MockTinyDB):
+        MockTinyDB.return_value.all.return_value = []
+        Library_DB().get_patron_count()
+        self.assertEqual(self.find('counters', 'library_db.get_patron_count.calls')['value'], 1)
+
+    @patch("library.library.Books_API")
+    @patch("library.library.Library_DB")
+    def test_library_methods(self, mock_db, mock_api):
+        library = Library()
+        library.api.get_ebooks.return_value = []
+        library.is_ebook("book")
+        self.assertEqual(self.find('counters', 'library.is_ebook.calls')['value'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
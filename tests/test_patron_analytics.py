@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+Filename: test_patron_analytics.py
+Description: Unit tests for the columnar patron analytics.
+"""
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestPatronAnalytics(unittest.TestCase):
+    def setUp(self):
+        from library.patron_analytics import PatronColumns
+        self.patrons = [
+            {"fname": "a", "lname": "a", "age": 8, "memberID": 1, "borrowed_books": ["dune", "emma"]},
+            {"fname": "b", "lname": "b", "age": 15, "memberID": 2, "borrowed_books": ["dune"]},
+            {"fname": "c", "lname": "c", "age": 16, "memberID": 3, "borrowed_books": []},
+            {"fname": "d", "lname": "d", "age": 40, "memberID": 4, "borrowed_books": ["emma", "dune", "ulysses"]}
+        ]
+        db = MagicMock()
+        db.get_all_patrons.return_value = self.patrons
+        self.columns = PatronColumns.from_db(db)
+
+    def test_columns(self):
+        self.assertEqual(len(self.columns), 4)
+        self.assertEqual(self.columns.borrowed_counts.tolist(), [2, 1, 0, 3])
+        self.assertEqual(self.columns.titles_for_patron(3), ["emma", "dune", "ulysses"])
+
+    def test_age_histogram(self):
+        counts, edges = self.columns.age_histogram(bins=[0, 13, 18, 100])
+        self.assertEqual(counts.tolist(), [1, 2, 1])
+
+    def test_borrow_count_histogram(self):
+        self.assertEqual(self.columns.borrow_count_histogram().tolist(), [1, 1, 1, 1])
+
+    def test_top_titles(self):
+        self.assertEqual(self.columns.top_titles(2), [("dune", 3), ("emma", 2)])
+        self.assertEqual(len(self.columns.top_titles(10)), 3)
+
+    def test_percentiles_by_age_band(self):
+        result = self.columns.percentiles_by_age_band([0, 13, 18, 65, 120], percentiles=(50, 100))
+        self.assertEqual(result, {
+            (0, 13): {50: 2.0, 100: 2.0},
+            (13, 18): {50: 0.5, 100: 1.0},
+            (18, 65): {50: 3.0, 100: 3.0}
+        })
+
+    def test_empty(self):
+        from library.patron_analytics import PatronColumns
+        columns = PatronColumns.from_patrons([])
+        self.assertEqual(columns.top_titles(), [])
+        self.assertEqual(columns.percentiles_by_age_band([0, 100]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from library.patron_index import SortedIndex
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+
+"""
+Filename: test_patron_index.py
+Description: Unit tests for the patron secondary indexes.
+"""
+
+class TestSortedIndex(unittest.TestCase):
+    def test_ranges(self):
+        index = SortedIndex()
+        for doc_id, key in enumerate([5, 3, 9, 3, 7]):
+            index.add(key, doc_id)
+        self.assertEqual(index.range_inclusive(3, 7), [1, 3, 0, 4])
+        self.assertEqual(index.range(3, 7), [1, 3, 0])
+        index.remove(3, 1)
+        self.assertEqual(index.range_inclusive(3, 3), [3])
+
+    def test_prefix(self):
+        index = SortedIndex()
+        for doc_id, key in enumerate(["ab", "a\U0010ffff", "a\U0010ffffz", "b", "a"]):
+            index.add(key, doc_id)
+        self.assertEqual(index.prefix("a"), [4, 0, 1, 2])
+        self.assertEqual(index.prefix("a\U0010ffff"), [1, 2])
+        self.assertEqual(index.prefix(""), [4, 0, 1, 2, 3])
+        self.assertEqual(index.prefix("c"), [])
+
+
+class TestLibraryDbIndexes(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.db = Library_DB(os.path.join(self.tmp_dir, "db.json"))
+        self.addCleanup(self.db.close_db)
+        for fname, lname, age, memberID in [("ann", "Smith", 15, 1), ("bob", "smythe", 13, 2),
+                ("cy", "Jones", 40, 3), ("dee", "Smalls", 17, 4), ("eve", "Brown", 18, 5)]:
+            self.db.insert_patron(Patron(fname, lname, age, memberID))
+
+    def names(self, patrons):
+        return [patron['fname'] for patron in patrons]
+
+    def test_find_by_age(self):
+        self.assertEqual(self.names(self.db.find_patrons_by_age(13, 17)), ["bob", "ann", "dee"])
+        self.assertEqual(self.db.find_patrons_by_age(60, 90), [])
+
+    def test_find_by_lname_prefix(self):
+        self.assertEqual(self.names(self.db.find_patrons_by_lname_prefix("sm")),
+            ["dee", "ann", "bob"])
+        self.assertEqual(self.names(self.db.find_patrons_by_lname_prefix("SMY")), ["bob"])
+        self.assertEqual(len(self.db.find_patrons_by_lname_prefix("")), 5)
+
+    def test_indexes_follow_insert_and_update(self):
+        self.db.find_patrons_by_age(0, 100)
+        self.db.insert_patron(Patron("fay", "Smart", 14, 6))
+        self.db.update_patron(Patron("ann", "Jonas", 30, 1))
+        self.assertEqual(self.names(self.db.find_patrons_by_age(13, 17)), ["bob", "fay", "dee"])
+        self.assertEqual(self.names(self.db.find_patrons_by_lname_prefix("jon")), ["ann", "cy"])
+        self.assertEqual(self.db.find_patrons_by_age(30, 30)[0]['lname'], "Jonas")
+
+    def test_indexed_borrowed_books_are_copies(self):
+        self.db.find_patrons_by_age(0, 100)
+        patron = Patron("ann", "Smith", 15, 1)
+        patron.add_borrowed_book("dune")
+        self.db.update_patron(patron)
+        patron.add_borrowed_book("emma")
+        found = self.db.find_patrons_by_age(15, 15)[0]
+        self.assertEqual(found['borrowed_books'], ["dune"])
+        found['borrowed_books'].append("iliad")
+        self.assertEqual(self.db.find_patrons_by_lname_prefix("smi")[0]['borrowed_books'],
+            ["dune"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from library.patron_snapshot import PatronSnapshot, InvalidSnapshotException, export_snapshot
+from library.patron import Patron
+
+"""
+Filename: test_patron_snapshot.py
+Description: Unit tests for memory-mapped patron snapshots.
+"""
+
+class TestPatronSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "patrons.snap")
+        self.patrons = [
+            {"fname": "ann", "lname": "lee", "age": 30, "memberID": "b2", "borrowed_books": ["dune"]},
+            {"fname": "bob", "lname": "ray", "age": 12, "memberID": 7, "borrowed_books": []},
+            {"fname": "cy", "lname": "oak", "age": 50, "memberID": "a1", "borrowed_books": []},
+            {"fname": "dee", "lname": "elm", "age": 41, "memberID": -3, "borrowed_books": []}
+        ]
+        self.db = MagicMock()
+        self.db.get_all_patrons.return_value = self.patrons
+        self.assertEqual(export_snapshot(self.db, self.path), 4)
+        self.snapshot = PatronSnapshot(self.path)
+        self.addCleanup(self.snapshot.close)
+
+    def test_get_patron_count(self):
+        self.assertEqual(self.snapshot.get_patron_count(), 4)
+
+    def test_get_all_patrons_in_db_order(self):
+        self.assertEqual(self.snapshot.get_all_patrons(), self.patrons)
+
+    def test_retrieve_patron(self):
+        self.assertEqual(self.snapshot.retrieve_patron("a1"), Patron("cy", "oak", 50, "a1"))
+        self.assertEqual(self.snapshot.retrieve_patron(7), Patron("bob", "ray", 12, 7))
+        self.assertEqual(self.snapshot.retrieve_patron(-3), Patron("dee", "elm", 41, -3))
+
+    def test_retrieve_patron_missing(self):
+        self.assertIsNone(self.snapshot.retrieve_patron("zz"))
+        self.assertIsNone(self.snapshot.retrieve_patron("7"))
+
+    def test_empty_snapshot(self):
+        self.db.get_all_patrons.return_value = []
+        path = os.path.join(self.tmp_dir, "empty.snap")
+        export_snapshot(self.db, path)
+        with PatronSnapshot(path) as snapshot:
+            self.assertEqual(snapshot.get_patron_count(), 0)
+            self.assertEqual(snapshot.get_all_patrons(), [])
+            self.assertIsNone(snapshot.retrieve_patron(1))
+
+    def test_invalid_file(self):
+        path = os.path.join(self.tmp_dir, "bad.snap")
+        with open(path, "wb") as bad_file:
+            bad_file.write(b"x" * 64)
+        with self.assertRaises(InvalidSnapshotException):
+            PatronSnapshot(path)
+
+        empty_path = os.path.join(self.tmp_dir, "empty-file.snap")
+        open(empty_path, "wb").close()
+        with self.assertRaises(InvalidSnapshotException):
+            PatronSnapshot(empty_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
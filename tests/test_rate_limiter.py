@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch, Mock
+from library import metrics
+from library.rate_limiter import RateLimiter
+from library.ext_api_interface import Books_API
+
+"""
+Filename: test_rate_limiter.py
+Description: Unit tests for the token bucket rate limiter.
+"""
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_timeout(self):
+        limiter = RateLimiter(rate=1, capacity=2)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+
+    def test_queues_until_refill(self):
+        limiter = RateLimiter(rate=50, capacity=1)
+        limiter.acquire()
+        start = time.monotonic()
+        self.assertTrue(limiter.acquire(RateLimiter.BATCH))
+        self.assertGreaterEqual(time.monotonic() - start, 0.01)
+        self.assertEqual(limiter.stats()['batch']['acquired'], 1)
+
+    def test_acquire_async_cancelled_takes_no_token(self):
+        limiter = RateLimiter(rate=20, capacity=1)
+        limiter.acquire()
+
+        async def cancel_then_acquire():
+            waiter = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            await asyncio.wait_for(limiter.acquire_async(RateLimiter.BATCH), 1)
+
+        asyncio.run(cancel_then_acquire())
+        stats = limiter.stats()
+        self.assertEqual(stats['interactive']['acquired'], 1)
+        self.assertEqual(stats['batch']['acquired'], 1)
+
+    def test_unknown_lane(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=1).acquire("bulk")
+
+    def test_interactive_served_before_batch(self):
+        limiter = RateLimiter(rate=20, capacity=1)
+        limiter.acquire()
+        order = []
+
+        def take(lane):
+            limiter.acquire(lane)
+            order.append(lane)
+
+        batch = [threading.Thread(target=take, args=(RateLimiter.BATCH,)) for _ in range(2)]
+        for thread in batch:
+            thread.start()
+        while limiter.stats()['batch']['queue_depth'] < 2:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=take, args=(RateLimiter.INTERACTIVE,))
+        interactive.start()
+        for thread in batch + [interactive]:
+            thread.join(5)
+        self.assertEqual(order[0], RateLimiter.INTERACTIVE)
+        self.assertEqual(limiter.stats()['batch']['max_queue_depth'], 2)
+
+    def test_wait_metrics(self):
+        metrics.registry.reset()
+        metrics.registry.enable()
+        self.addCleanup(metrics.registry.disable)
+        self.addCleanup(metrics.registry.reset)
+        RateLimiter(rate=1).acquire()
+        names = [entry['name'] for entry in metrics.registry.snapshot()['histograms']]
+        self.assertIn('rate_limiter.wait', names)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_shared_by_books_api_instances(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"docs": []}
+        limiter = Mock()
+        with patch.object(Books_API, "rate_limiter", limiter):
+            Books_API().make_request("http://openlibrary.org/search.json?q=a")
+            Books_API(priority=RateLimiter.BATCH).make_request(
+                "http://openlibrary.org/search.json?q=b")
+        self.assertEqual([c[0][0] for c in limiter.acquire.call_args_list],
+            [RateLimiter.INTERACTIVE, RateLimiter.BATCH])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import threading
+import unittest
+from unittest.mock import patch, Mock
+from library.resilience import CircuitBreaker, RetryPolicy
+from library.response_cache import ResponseCache
+from library.ext_api_interface import Books_API
+import requests
+
+"""
+Filename: test_resilience.py
+Description: Unit tests for retries, hedging, the circuit breaker and the response cache.
+"""
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def response(status, data=None):
+    mock_response = Mock()
+    mock_response.status_code = status
+    mock_response.json.return_value = data
+    return mock_response
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_half_open_single_trial(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_failure_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_released_or_expired_trial(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.release_trial()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow_request())
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay_bounded(self):
+        policy = RetryPolicy(backoff_base=0.1, backoff_max=0.3)
+        for retry in range(6):
+            self.assertTrue(0 <= policy.delay(retry) <= min(0.3, 0.1 * 2 ** retry))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_ttl_and_stale(self):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=5, clock=clock)
+        cache.put("url", {"docs": []})
+        self.assertEqual(cache.get("url"), {"docs": []})
+        clock.now = 6
+        self.assertIsNone(cache.get("url"))
+        self.assertEqual(cache.get_stale("url"), {"docs": []})
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+
+class TestBooksApiResilience(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.retry = RetryPolicy(max_retries=2, sleep=self.sleeps.append)
+        self.url = "http://openlibrary.org/search.json?q=book"
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_timeouts_passed(self, mock_get):
+        mock_get.return_value = response(200, {"docs": []})
+        Books_API().make_request(self.url)
+        mock_get.assert_called_with(self.url,
+            timeout=(Books_API.CONNECT_TIMEOUT, Books_API.READ_TIMEOUT))
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_retries_transient_errors(self, mock_get):
+        mock_get.side_effect = [requests.Timeout(), response(503), response(200, {"docs": []})]
+        result = Books_API(retry=self.retry).make_request(self.url)
+        self.assertEqual(result, {"docs": []})
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_does_not_retry_not_found(self, mock_get):
+        mock_get.return_value = response(404)
+        self.assertIsNone(Books_API(retry=self.retry).make_request(self.url))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_breaker_fails_fast_with_stale_cache(self, mock_get):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=1, clock=clock)
+        api = Books_API(cache=cache, breaker=CircuitBreaker(failure_threshold=1),
+            retry=RetryPolicy(max_retries=0))
+        mock_get.return_value = response(200, {"docs": ["cached"]})
+        api.make_request(self.url)
+        clock.now = 5
+
+        mock_get.return_value = response(500)
+        self.assertEqual(api.make_request(self.url), {"docs": ["cached"]})
+        self.assertEqual(api.breaker.state, CircuitBreaker.OPEN)
+        calls = mock_get.call_count
+        self.assertEqual(api.make_request(self.url), {"docs": ["cached"]})
+        self.assertEqual(mock_get.call_count, calls)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_interrupted_trial_released(self, mock_get):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        mock_get.side_effect = KeyboardInterrupt
+        api = Books_API(breaker=breaker, retry=self.retry)
+        with self.assertRaises(KeyboardInterrupt):
+            api.make_request(self.url)
+        mock_get.side_effect = None
+        mock_get.return_value = response(200, {"docs": []})
+        self.assertEqual(api.make_request(self.url), {"docs": []})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_fresh_cache_skips_request(self, mock_get):
+        mock_get.return_value = response(200, {"docs": []})
+        api = Books_API(cache=ResponseCache())
+        api.make_request(self.url)
+        api.make_request(self.url)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_hedged_request(self, mock_get):
+        release = threading.Event()
+
+        def slow_then_fast(url, timeout):
+            if mock_get.call_count == 1:
+                release.wait(5)
+                return response(200, {"docs": ["slow"]})
+            return response(200, {"docs": ["fast"]})
+
+        mock_get.side_effect = slow_then_fast
+        api = Books_API(hedge_after=0.01)
+        self.assertEqual(api.make_request(self.url), {"docs": ["fast"]})
+        release.set()
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+"""
+Filename: test_startup.py
+Description: Startup-time benchmark guarding the lazy construction of Library.
+"""
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from library.library import Library
+library = Library()
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'requests': 'requests' in sys.modules,
+    'tinydb': 'tinydb' in sys.modules}))
+"""
+
+# generous budget so slow machines pass, eager imports are caught by
+# test_heavy_modules_not_imported
+STARTUP_BUDGET = 0.1
+RUNS = 5
+
+class TestStartup(unittest.TestCase):
+    def run_startup(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT], cwd=root)
+        return json.loads(output.decode())
+
+    def test_heavy_modules_not_imported(self):
+        result = self.run_startup()
+        self.assertFalse(result['requests'])
+        self.assertFalse(result['tinydb'])
+
+    def test_startup_time_budget(self):
+        timings = sorted(self.run_startup()['elapsed'] for _ in range(RUNS))
+        median = timings[RUNS // 2]
+        self.assertLess(median, STARTUP_BUDGET,
+            "Library import and construction took %.3fs" % median)
+
+
+if __name__ == '__main__':
+    unittest.main()
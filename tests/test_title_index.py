@@ -0,0 +1,87 @@
+import os
+import time
+import random
+import shutil
+import tempfile
+import unittest
+from library.title_index import TitleIndex, prefix_distance
+from library.library import Library
+from library.library_db_interface import Library_DB
+
+"""
+Filename: test_title_index.py
+Description: Unit tests for the borrowed title index.
+"""
+
+class TestTitleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TitleIndex.build([
+            {"borrowed_books": ["the hobbit", "the hunger games"]},
+            {"borrowed_books": ["the hobbit", "dune"]},
+            {"borrowed_books": ["hamlet"]}
+        ])
+
+    def test_prefix_distance(self):
+        self.assertEqual(prefix_distance("hobit", "hobbit house", 2), 1)
+        self.assertIsNone(prefix_distance("zzzz", "hobbit", 2))
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete("The H"), ["the hobbit", "the hunger games"])
+        self.assertEqual(self.index.complete("the h", limit=1), ["the hobbit"])
+        self.assertEqual(self.index.complete("x"), [])
+
+    def test_match_with_typos(self):
+        self.assertEqual(self.index.match("teh hob"), ["the hobbit"])
+        self.assertEqual(self.index.match("dnue"), ["dune"])
+
+    def test_remove_by_holder_count(self):
+        self.index.remove("the hobbit")
+        self.assertEqual(self.index.holders("the hobbit"), 1)
+        self.index.remove("the hobbit")
+        self.assertNotIn("the hobbit", self.index)
+        self.assertEqual(self.index.match("the hob"), ["the hunger games"])
+
+    def test_latency_bounded(self):
+        rng = random.Random(0)
+        words = ["lord", "rings", "hobbit", "silent", "river", "night", "garden", "winter", "the"]
+        index = TitleIndex()
+        for _ in range(20000):
+            index.add(" ".join(rng.choice(words) for _ in range(4)) + " %d" % rng.randint(0, 999))
+        start = time.perf_counter()
+        for query in ("the", "silnt riv", "gardne", "night w"):
+            index.match(query)
+            index.complete(query)
+        self.assertLess((time.perf_counter() - start) / 4, 0.05)
+
+
+class TestLibraryTitleIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.library = Library()
+        self.library.db = Library_DB(os.path.join(self.tmp_dir, "db.json"))
+        self.addCleanup(self.library.db.close_db)
+        self.library.register_patron("bea", "ray", 40, 2)
+        self.library.borrow_book("Dune", self.library.db.retrieve_patron(2))
+
+    def test_maintained_on_borrow_and_return(self):
+        self.library.register_patron("ann", "lee", 30, 1)
+        patron = self.library.db.retrieve_patron(1)
+        self.assertEqual(self.library.complete_title("d"), ["dune"])
+        self.library.borrow_book("Dracula", patron)
+        self.library.borrow_book("Dracula", patron)
+        self.assertEqual(self.library.complete_title("d"), ["dracula", "dune"])
+        self.assertEqual(self.library.match_title("drcula"), ["dracula"])
+        self.library.return_borrowed_book("Dracula", patron)
+        self.assertEqual(self.library.complete_title("d"), ["dune"])
+
+    def test_follows_stored_books_of_retrieved_patron(self):
+        self.assertEqual(self.library.complete_title("d"), ["dune"])
+        # the retrieved Patron has no borrowed books, so this write drops "dune"
+        self.library.borrow_book("Emma", self.library.db.retrieve_patron(2))
+        self.assertEqual(self.library.complete_title("d"), [])
+        self.assertEqual(self.library.complete_title("e"), ["emma"])
+        self.assertEqual(self.library.title_index.holders("emma"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
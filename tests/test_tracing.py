@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from library import tracing
+from library.tracing import Tracer, SamplingProfiler
+from library.ext_api_interface import Books_API
+from library.library import Library
+
+"""
+Filename: test_tracing.py
+Description: Unit tests for tracing spans and the sampling profiler hook.
+"""
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        tracing.tracer.reset()
+        tracing.tracer.enable()
+        self.addCleanup(tracing.tracer.disable)
+        self.addCleanup(tracing.tracer.reset)
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer()
+        with tracer.span("outer") as span:
+            self.assertIsNone(span)
+        self.assertEqual(tracer.get_traces(), [])
+
+    def test_nested_spans(self):
+        with tracing.span("outer"):
+            with tracing.span("inner", size=3):
+                pass
+        traces = tracing.tracer.get_traces()
+        self.assertEqual(len(traces), 1)
+        self.assertEqual(traces[0]['name'], "outer")
+        self.assertEqual(traces[0]['children'][0]['name'], "inner")
+        self.assertEqual(traces[0]['children'][0]['attributes'], {"size": 3})
+
+    def test_span_records_error(self):
+        with self.assertRaises(KeyError):
+            with tracing.span("failing"):
+                raise KeyError()
+        self.assertEqual(tracing.tracer.get_traces()[0]['attributes'], {"error": "KeyError"})
+
+    @patch("library.ext_api_interface.requests.get")
+    @patch("library.library.Library_DB")
+    def test_get_languages_for_book_phases(self, mock_db, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"docs": [{"title": "book", "language": ["eng"]}]}
+        with patch("library.library.Books_API", Books_API):
+            library = Library()
+            self.assertEqual(library.get_languages_for_book("book"), {"eng"})
+
+        root = tracing.tracer.get_traces()[0]
+        self.assertEqual(root['name'], "library.get_languages_for_book")
+        book_info = root['children'][0]
+        self.assertEqual(book_info['name'], "books_api.get_book_info")
+        names = [child['name'] for child in book_info['children']]
+        self.assertEqual(names, ["books_api.make_request", "books_api.parse_docs"])
+        request_phases = [child['name'] for child in book_info['children'][0]['children']]
+        self.assertEqual(request_phases, ["books_api.http", "books_api.decode"])
+
+    @patch("library.ext_api_interface.requests.get")
+    def test_hedged_request_phases_nest_under_make_request(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"docs": [{"title": "book"}]}
+        Books_API(hedge_after=1.0).get_book_info("book")
+
+        traces = tracing.tracer.get_traces()
+        self.assertEqual(len(traces), 1)
+        make_request = traces[0]['children'][0]
+        self.assertEqual(make_request['name'], "books_api.make_request")
+        request_phases = [child['name'] for child in make_request['children']]
+        self.assertEqual(request_phases, ["books_api.http", "books_api.decode"])
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        self.addCleanup(tracing.profiler.disable)
+
+    def test_disabled_profiler_calls_through(self):
+        profiler = SamplingProfiler()
+        self.assertEqual(profiler.call("sum", sum, [1, 2]), 3)
+
+    def test_sampled_calls_dump_profiles(self):
+        tracing.profiler.configure(1.0, self.output_dir)
+
+        @tracing.traced("work")
+        def work():
+            return sum(range(100))
+
+        self.assertEqual(work(), 4950)
+        files = os.listdir(self.output_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("work-"))
+
+    def test_concurrent_sampled_calls_profile_once(self):
+        tracing.profiler.configure(1.0, self.output_dir)
+        inside = threading.Event()
+        release = threading.Event()
+
+        @tracing.traced("slow")
+        def slow():
+            inside.set()
+            release.wait(5)
+            return "slow"
+
+        @tracing.traced("fast")
+        def fast():
+            return "fast"
+
+        thread = threading.Thread(target=slow)
+        thread.start()
+        inside.wait(5)
+        self.assertEqual(fast(), "fast")
+        release.set()
+        thread.join(5)
+        self.assertEqual([name.split("-")[0] for name in os.listdir(self.output_dir)], ["slow"])
+
+    def test_sample_rate_fraction(self):
+        tracing.profiler.configure(0.5, self.output_dir, seed=1)
+
+        @tracing.traced("work")
+        def work():
+            return 1
+
+        for _ in range(100):
+            work()
+        self.assertTrue(20 < len(os.listdir(self.output_dir)) < 80)
+
+
+if __name__ == '__main__':
+    unittest.main()